@@ -0,0 +1,143 @@
+# Space Shooter batch balance runner
+# ===============================================================#
+# Plays many headless games with the built-in dodge-and-shoot bot across a process pool and
+# streams per-(difficulty, parameter set) summaries: waves reached, score distribution,
+# time-to-death and simulated frames/sec.
+#
+#   python batch.py --games 200                                   # all difficulties, default tuning
+#   python batch.py -d Hard --set ENEMY_SPAWN_BASE=0.9,1.05,1.2   # sweep a constant
+#   python batch.py --set BOSS_HP=300,450 --set WAVE_SCALE_STEP=0.08,0.11
+#   python batch.py --set Normal.spawn_mul=0.9,1.0 --out runs.jsonl
+#
+# Sweepable: the gameplay constants in SWEEPABLE (ENEMY_SPAWN_BASE, BOSS_HP, WAVE_SCALE_STEP, ...)
+# and DIFFICULTIES entries as <Difficulty>.<key>. Every --set adds an axis; sets are the cartesian product.
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+
+import main as ss
+
+_DEFAULTS = {}
+
+# main.py constants the simulation reads at run time. Others (FPS, BULLET_CAPACITY, STAR_COUNT, ...) are
+# bound into default arguments or tables at import, so setting them in a worker would silently do nothing.
+SWEEPABLE = frozenset((
+    "PLAYER_SPEED", "PLAYER_SLOW_MULT", "PLAYER_RADIUS", "PLAYER_MAX_HP", "PLAYER_IFRAMES",
+    "BULLET_SPEED", "BULLET_LIFETIME", "FIRE_COOLDOWN",
+    "ENEMY_BASE_SPEED", "ENEMY_SPAWN_BASE", "ENEMY_HP", "ENEMY_BULLET_SPEED", "ENEMY_FIRE_COOLDOWN",
+    "WAVE_DURATION", "WAVE_BANNER_TIME", "WAVE_SCALE_STEP", "BOSS_WARNING_TIME",
+    "BOSS_HP", "BOSS_SPEED", "BOSS_FIRE_COOLDOWN",
+    "POWERUP_SPAWN_BASE", "POWERUP_DURATION", "SHIELD_HP",
+    "COMBO_WINDOW", "COMBO_STEP", "MAX_MULTIPLIER", "SHAKE_DECAY", "PARTICLE_LIFE",
+))
+
+def apply_params(params):
+    # worker-local overrides; restores the defaults of anything the previous task touched
+    for key, value in _DEFAULTS.items():
+        diff, _, field = key.partition(".")
+        if field: ss.DIFFICULTIES[diff][field] = value
+        else: setattr(ss, key, value)
+    for key, value in params.items():
+        diff, _, field = key.partition(".")
+        if field:
+            _DEFAULTS.setdefault(key, ss.DIFFICULTIES[diff][field])
+            ss.DIFFICULTIES[diff][field] = value
+        else:
+            _DEFAULTS.setdefault(key, getattr(ss, key))
+            setattr(ss, key, value)
+
+def run_game(task):
+    label, params, difficulty, seed, frames = task
+    apply_params(params)
+    r = ss.simulate(frames, seed, difficulty, inputs=ss.bot_input)
+    return {"label": label, "params": params, "difficulty": difficulty, "seed": seed, "frames": r["frames"],
+            "wave": r["wave"], "score": r["score"], "died": r["state"] == ss.Game.GAMEOVER,
+            "time": r["sim_seconds"], "fps": r["fps"]}
+
+def parse_set(spec):
+    key, _, values = spec.partition("=")
+    diff, _, field = key.partition(".")
+    if field:
+        if diff not in ss.DIFFICULTIES or field not in ss.DIFFICULTIES[diff]:
+            raise argparse.ArgumentTypeError(f"unknown difficulty setting {key}")
+    elif key not in SWEEPABLE:
+        raise argparse.ArgumentTypeError(f"{key} is not a sweepable constant; choose from {', '.join(sorted(SWEEPABLE))}")
+    cast = int if not field and isinstance(getattr(ss, key), int) else float
+    return key, [cast(v) for v in values.split(",")]
+
+def param_sets(sets):
+    if not sets: return [("default", {})]
+    keys = [k for k, _ in sets]
+    out = []
+    for combo in itertools.product(*(vals for _, vals in sets)):
+        params = dict(zip(keys, combo))
+        out.append((" ".join(f"{k}={v}" for k, v in params.items()), params))
+    return out
+
+def summarize(rows):
+    waves = np.array([r["wave"] for r in rows])
+    scores = np.array([r["score"] for r in rows])
+    deaths = [r["time"] for r in rows if r["died"]]
+    return {"games": len(rows), "wave_mean": float(waves.mean()), "wave_max": int(waves.max()),
+            "score_p10": float(np.percentile(scores, 10)), "score_p50": float(np.percentile(scores, 50)),
+            "score_p90": float(np.percentile(scores, 90)), "died": len(deaths) / len(rows),
+            "ttd_mean": float(np.mean(deaths)) if deaths else float("nan"),
+            "ttd_p50": float(np.median(deaths)) if deaths else float("nan"),
+            "sim_fps": float(np.mean([r["fps"] for r in rows]))}
+
+def print_summary(groups):
+    print(f"{'difficulty':<8} {'params':<36}{'games':>6}{'wave':>6}{'max':>5}{'score p10/p50/p90':>22}"
+          f"{'died':>6}{'ttd s':>8}{'sim fps':>9}")
+    for (diff, label), rows in sorted(groups.items()):
+        s = summarize(rows)
+        scores = f"{s['score_p10']:.0f}/{s['score_p50']:.0f}/{s['score_p90']:.0f}"
+        print(f"{diff:<8} {label:<36}{s['games']:>6}{s['wave_mean']:>6.1f}{s['wave_max']:>5}{scores:>22}"
+              f"{s['died']:>6.0%}{s['ttd_mean']:>8.1f}{s['sim_fps']:>9.0f}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Space Shooter batch balance runner")
+    ap.add_argument("-d", "--difficulty", action="append", choices=list(ss.DIFFICULTIES), help="difficulty (repeatable; default all)")
+    ap.add_argument("--set", action="append", type=parse_set, default=[], metavar="NAME=V1,V2,...", help="sweep axis (repeatable)")
+    ap.add_argument("--games", type=int, default=64, help="games per difficulty and parameter set")
+    ap.add_argument("--frames", type=int, default=ss.FPS * 60 * 10, help="frame cap per game")
+    ap.add_argument("--seed", type=int, default=0, help="base seed; game seeds are derived from it")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--out", help="stream raw per-game results here as JSON lines")
+    args = ap.parse_args(argv)
+
+    seeds = random.Random(args.seed)
+    game_seeds = [seeds.getrandbits(63) for _ in range(args.games)]
+    tasks = [(label, params, diff, seed, args.frames)
+             for label, params in param_sets(args.set)
+             for diff in args.difficulty or list(ss.DIFFICULTIES)
+             for seed in game_seeds]
+    groups = {}
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    t0 = time.perf_counter()
+    frames = 0
+    with mp.Pool(args.workers) as pool:
+        for i, r in enumerate(pool.imap_unordered(run_game, tasks, chunksize=max(1, len(tasks) // (args.workers * 8))), 1):
+            groups.setdefault((r["difficulty"], r["label"]), []).append(r)
+            frames += r["frames"]
+            if out: out.write(json.dumps(r) + "\n")
+            if i % max(1, len(tasks) // 20) == 0 or i == len(tasks):
+                wall = time.perf_counter() - t0
+                print(f"[{i}/{len(tasks)}] {wall:.1f}s  {frames / wall:.0f} sim frames/s total", file=sys.stderr, flush=True)
+    if out: out.close()
+    print_summary(groups)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
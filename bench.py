@@ -0,0 +1,211 @@
+# Space Shooter stress benchmarks
+# ===============================================================#
+# Runs named scenarios through Game.update / Game.draw at a fixed dt and reports
+# mean / p50 / p95 / p99 frame times (ms), split into update and draw.
+#
+#   python bench.py                              # all scenarios, print table
+#   python bench.py --out bench.json             # also save results
+#   python bench.py --baseline bench.json        # compare; exit code 1 on regression
+#   python bench.py -s boss_60s -s shooters_300  # pick scenarios
+#   python bench.py --primitives                 # draw with pygame.draw calls instead of the sprite atlas
+#   python bench.py --gc python                  # stock garbage collector instead of the game's managed mode
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+import main as ss
+
+DT = 1.0 / ss.FPS
+
+def _keep_alive(game):
+    game.player.hp = ss.PLAYER_MAX_HP
+    game.player.iframes = 0.0
+
+def setup_bullets(game):
+    game.player.spread_time = 1e9
+    game.player.rapid_time = 1e9
+    for i in range(2000):
+        game.bullets.spawn(60 + (i * 37) % (ss.WIDTH - 120), 30 + (i * 53) % (ss.HEIGHT - 60),
+                           ss.BULLET_SPEED * 0.02, 0.0, True, 4, ss.BC_PLAYER)
+    for i in range(12):
+        game.add_enemy(ss.EnemyChaser((ss.WIDTH * 0.5 + i * 30, 40 + i * 38), 0.0, hp=10**9))
+
+def tick_bullets(game, frame):
+    # keep the pool topped up around 2,000 friendly bullets
+    while len(game.bullets) < 2000:
+        y = game.rng.uniform(30, ss.HEIGHT - 30)
+        game.bullets.spawn(60, y, ss.BULLET_SPEED * 0.5, game.rng.uniform(-40, 40), True, 4, ss.BC_SPREAD)
+
+def setup_shooters(game):
+    for i in range(300):
+        x = ss.WIDTH * 0.3 + (i * 29) % int(ss.WIDTH * 0.6)
+        y = 30 + (i * 17) % (ss.HEIGHT - 60)
+        game.add_enemy(ss.EnemyShooter((x, y), 0.0, hp=10**9, rng=game.rng))
+
+def tick_horde(game, frame):
+    # wave-10+ style horde: keep ~600 chasers and shooters streaming in from the right edge
+    while len(game.enemies) < 600:
+        y = game.rng.uniform(30, ss.HEIGHT - 30)
+        x = ss.WIDTH + game.rng.uniform(20, 400)
+        if game.rng.random() < 0.4:
+            game.add_enemy(game.pools[ss.EnemyShooter].acquire((x, y), 120.0, hp=10**9, rng=game.rng))
+        else:
+            game.add_enemy(game.pools[ss.EnemyChaser].acquire((x, y), 160.0, hp=10**9))
+
+def _jump_to_wave(game, wave):
+    # start the run at `wave`: its difficulty values, and the wave timer re-armed for the end of that wave
+    # (the wave's own timeline is skipped; setups spawn the boss they want)
+    game.wave = wave
+    game.wp = ss.WaveParams(wave, game.difficulty)
+    game.arm(ss.T_WAVE, wave * ss.WAVE_DURATION)
+
+def setup_boss(game):
+    _jump_to_wave(game, 4)
+    game.spawn_boss_now("classic")
+    game.enemies[-1].hp = 10**9
+
+def setup_boss_storm(game):
+    _jump_to_wave(game, 12)
+    game.spawn_boss_now("storm")
+    game.enemies[-1].hp = 10**9
+
+def tick_particles(game, frame):
+    for i in range(40):
+        e = game.pools[ss.EnemyChaser].acquire((game.rng.uniform(0, ss.WIDTH), game.rng.uniform(0, ss.HEIGHT)), 0.0)
+        game.enemy_killed(e)
+        game.release(e)
+
+SCENARIOS = {
+    # name: (frames, setup(game), tick(game, frame) or None, held input bits)
+    "bullets_2000_spread": (600, setup_bullets, tick_bullets, ss.IN_SHOOT),
+    "shooters_300": (600, setup_shooters, None, ss.IN_SHOOT),
+    "boss_60s": (60 * ss.FPS, setup_boss, None, ss.IN_SHOOT | ss.IN_UP),
+    "horde_600": (600, None, tick_horde, ss.IN_SHOOT),
+    "boss_storm": (1200, setup_boss_storm, None, ss.IN_SHOOT | ss.IN_UP),
+    "particle_storm": (600, None, tick_particles, 0),
+}
+
+def percentiles(samples):
+    a = np.asarray(samples) * 1000.0
+    return {"mean": float(a.mean()), "p50": float(np.percentile(a, 50)),
+            "p95": float(np.percentile(a, 95)), "p99": float(np.percentile(a, 99))}
+
+def pool_created(game):
+    return sum(pool.created for pool in game.pools.values())
+
+def run_scenario(name, screen, font, bigfont, frames=None, seed=0, primitives=False, gcc=None):
+    n, setup, tick, bits = SCENARIOS[name]
+    n = frames or n
+    game = ss.Game(ss.SoundManager(False), seed=seed, persist=False)
+    game.use_sprites = not primitives
+    game.reset_run()
+    if setup: setup(game)
+    keys = ss.InputState(bits)
+    upd, drw, gcp, pairs = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+    pc = time.perf_counter
+    half = n // 2
+    for f in range(n):
+        if f == half:
+            # allocation counters over the second half, once pools and caches are warm
+            created0, blocks0 = pool_created(game), sys.getallocatedblocks()
+        if tick: tick(game, f)
+        _keep_alive(game)
+        t0 = pc()
+        game.update(DT, keys)
+        t1 = pc()
+        pairs[f] = game.pair_tests
+        game.draw(screen, font, bigfont)
+        t2 = pc()
+        upd[f] = t1 - t0; drw[f] = t2 - t1
+        if gcc is not None:
+            gcp[f] = gcc.pause   # collections that landed inside this frame's update/draw
+            gcc.frame(game, t2 - t0)
+    tot = upd + drw
+    frames = max(1, n - half)
+    alloc = {"entities_created_per_frame": (pool_created(game) - created0) / frames,
+             "block_growth_per_frame": (sys.getallocatedblocks() - blocks0) / frames,
+             "pools": game.alloc_stats()}
+    gc_stats = {"frames_with_pause": int((gcp > 0).sum()), "pause_max_ms": float(gcp.max()) * 1000.0}
+    collisions = {"pair_tests_per_frame": float(pairs.mean()), "pair_tests_max": int(pairs.max())}
+    return {"alloc": alloc, "gc": gc_stats, "collisions": collisions, "frames": n, "update": percentiles(upd), "draw": percentiles(drw), "total": percentiles(tot),
+            "entities": {"enemies": len(game.enemies), "bullets": len(game.bullets), "particles": len(game.particles)}}
+
+def compare(results, baseline, tolerance):
+    # a metric regresses when it is slower than baseline by more than `tolerance` (fraction)
+    failures = []
+    for name, r in results["scenarios"].items():
+        b = baseline.get("scenarios", {}).get(name)
+        if b is None: continue
+        for phase in ("update", "draw", "total"):
+            for metric in ("mean", "p95"):
+                new, old = r[phase][metric], b[phase][metric]
+                if old > 0 and new > old * (1.0 + tolerance):
+                    failures.append(f"{name}.{phase}.{metric}: {old:.3f} -> {new:.3f} ms (+{(new / old - 1) * 100:.0f}%)")
+    return failures
+
+def print_table(results):
+    print(f"{'scenario':<22}{'phase':<8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}   (ms)")
+    for name, r in results["scenarios"].items():
+        for phase in ("update", "draw", "total"):
+            p = r[phase]
+            print(f"{name:<22}{phase:<8}{p['mean']:>9.3f}{p['p50']:>9.3f}{p['p95']:>9.3f}{p['p99']:>9.3f}")
+    print(f"{'scenario':<22}{'new entities/frame':>20}{'heap blocks/frame':>20}   (second half)"
+          f"{'gc frames':>12}{'worst gc ms':>13}{'pairs/frame':>13}")
+    for name, r in results["scenarios"].items():
+        a, g = r["alloc"], r["gc"]
+        print(f"{name:<22}{a['entities_created_per_frame']:>20.3f}{a['block_growth_per_frame']:>20.2f}{'':>16}"
+              f"{g['frames_with_pause']:>12}{g['pause_max_ms']:>13.2f}{r['collisions']['pair_tests_per_frame']:>13.0f}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Space Shooter stress benchmarks")
+    ap.add_argument("-s", "--scenario", action="append", choices=list(SCENARIOS), help="scenario to run (repeatable; default all)")
+    ap.add_argument("--frames", type=int, default=None, help="override frames per scenario")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--primitives", action="store_true", help="draw entities with pygame.draw primitives instead of the sprite atlas")
+    ap.add_argument("--gc", choices=("managed", "python"), default="managed", help="garbage collector mode, as in main.py --gc")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", help="baseline results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown vs baseline (0.15 = 15%%)")
+    args = ap.parse_args(argv)
+
+    pygame.init()
+    screen = pygame.display.set_mode((ss.WIDTH, ss.HEIGHT))
+    font = pygame.font.Font(None, 24)
+    bigfont = pygame.font.Font(None, 60)
+    results = {"meta": {"python": platform.python_version(), "pygame": pygame.version.ver, "numpy": np.__version__,
+                        "machine": platform.machine(), "video": os.environ.get("SDL_VIDEODRIVER", ""),
+                        "draw_path": "primitives" if args.primitives else "sprites", "gc": args.gc},
+               "scenarios": {}}
+    gcc = ss.GcControl(args.gc)
+    gcc.start()
+    for name in args.scenario or list(SCENARIOS):
+        results["scenarios"][name] = run_scenario(name, screen, font, bigfont, args.frames, args.seed, args.primitives, gcc)
+    gcc.stop()
+    pygame.quit()
+
+    print_table(results)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        if failures:
+            print("REGRESSIONS:")
+            for line in failures: print("  " + line)
+            return 1
+        print(f"no regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
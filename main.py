@@ -2,11 +2,27 @@
 # ===============================================================#
 # Controls:
 # Move: WASD/Arrows | Shoot: SPACE (hold) | Slow: LSHIFT | Pause: P | Restart: R | Quit: ESC
+# Rewind: BACKSPACE (hold) | Quick save/load: F5/F9
 # Menu: 1/2/3 difficulty, ENTER start
 
+import time
+IMPORT_T0 = time.perf_counter()  # startup report: start of module imports
+
+import argparse
+import gc
+import hashlib
+import heapq
+import json
 import math
+import os
+import queue
 import random
 import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict, deque
+import numpy as np
 import pygame
 
 #  EASY SETTINGS (Edit here) 
@@ -24,6 +40,8 @@ FEATURES = {
 
 WIDTH, HEIGHT = 960, 540
 FPS = 60
+TICK_RATE = 60              # fixed simulation steps per second
+MAX_CATCHUP_STEPS = 5       # sim steps allowed per rendered frame before the backlog is dropped
 
 PLAYER_SPEED = 420.0
 PLAYER_SLOW_MULT = 0.55
@@ -34,6 +52,8 @@ PLAYER_IFRAMES = 0.9
 BULLET_SPEED = 780.0
 BULLET_LIFETIME = 1.4
 FIRE_COOLDOWN = 0.11
+BULLET_CAPACITY = 8192
+BULLET_MAX_RADIUS = 5
 
 ENEMY_BASE_SPEED = 150.0
 ENEMY_SPAWN_BASE = 1.05
@@ -44,7 +64,7 @@ ENEMY_FIRE_COOLDOWN = 1.35
 
 WAVE_DURATION = 18.0
 WAVE_BANNER_TIME = 2.0
-BOSS_EVERY_WAVES = 4
+WAVE_SCALE_STEP = 0.11
 BOSS_WARNING_TIME = 2.2
 
 BOSS_HP = 450
@@ -59,8 +79,12 @@ COMBO_WINDOW = 1.8
 COMBO_STEP = 6
 MAX_MULTIPLIER = 6
 
+STAR_COUNT = 80
+STAR_LAYERS = 4
+
 SHAKE_DECAY = 18.0
 PARTICLE_LIFE = 0.55
+PARTICLE_CAPACITY = 32768
 
 MASTER_VOLUME = 0.30
 SFX_VOLUME = 0.65
@@ -72,7 +96,17 @@ DIFFICULTIES = {
     "Hard":   {"enemy_mul": 1.15, "spawn_mul": 0.88, "boss_mul": 1.1},
 }
 
+WAVES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "waves.json")
 HIGHSCORE_FILE = "highscore.txt"
+SCORES_FILE = "scores.json"
+LEADERBOARD_SIZE = 10
+SOUND_CACHE_DIR = ".sound_cache"
+REPLAY_DIR = "replays"
+QUICKSAVE_FILE = os.path.join(REPLAY_DIR, "quick.sss")
+HISTORY_BUDGET_MB = 64   # rewind history kept in memory
+HISTORY_KEYFRAME = 60    # steps between full (keyframe) history entries
+GC_PLAY_LIMIT = 20000    # young objects allowed to pile up during play before a gen-0 collection is forced
+GC_SWEEP_FRAMES = 3600   # frames of play without a safe point before a full sweep runs anyway
 
 def clamp(v, a, b):
     return max(a, min(b, v))
@@ -84,65 +118,232 @@ def load_highscore():
     except Exception:
         return 0
 
-def save_highscore(v: int):
-    try:
-        with open(HIGHSCORE_FILE, "w", encoding="utf-8") as f:
-            f.write(str(int(v)))
-    except Exception:
-        pass
+def atomic_write(path, data: bytes):
+    # write a sibling temp file, fsync it, then rename over the target: readers (and a crash)
+    # only ever see the old file or the complete new one
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class ScoreStore:
+    # per-difficulty top-N leaderboards in SCORES_FILE; highscore.txt keeps the overall best for
+    # older builds. Loading and every write happen on one daemon thread: submit() only updates
+    # memory and hands the writer a snapshot, so game over never waits on disk. write() queues any
+    # other file (replays) for the same thread; the newest data per path wins.
+    MAX_FILE_BYTES = 1 << 20
+    def __init__(self, path=SCORES_FILE, legacy=HIGHSCORE_FILE, size=LEADERBOARD_SIZE, on_load=None):
+        self.path, self.legacy, self.size = path, legacy, size
+        self.on_load = on_load
+        self.boards = {}
+        self.lock = threading.Lock()
+        self.loaded = threading.Event()
+        self.wake = threading.Event()
+        self.pending = None
+        self.files = {}
+        self.closing = False
+        self.errors = []
+        self.thread = threading.Thread(target=self._run, name="score-writer", daemon=True)
+        self.thread.start()
+
+    def _load(self):
+        boards = {}
+        try:
+            if os.path.getsize(self.path) > self.MAX_FILE_BYTES:
+                raise ValueError(f"{self.path} is larger than {self.MAX_FILE_BYTES} bytes")
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f).get("boards", {})
+            for diff, rows in raw.items():
+                rows = [{"score": int(r["score"]), "wave": int(r["wave"]), "time": float(r["time"])} for r in rows]
+                boards[diff] = sorted(rows, key=lambda r: (-r["score"], r["time"]))[:self.size]
+        except FileNotFoundError:
+            boards = self._from_legacy()
+        except Exception as e:
+            # any bad row (e.g. 1e999 -> OverflowError) falls back rather than killing the writer thread
+            self._error(f"could not read {self.path}: {e!r}; keeping it as {self.path}.bad")
+            try: os.replace(self.path, self.path + ".bad")
+            except OSError: pass
+            boards = self._from_legacy()
+        with self.lock:
+            self.boards = boards
+
+    def _from_legacy(self):
+        # highscore.txt predates difficulties; its best score seeds the Normal board
+        best = load_highscore()
+        return {"Normal": [{"score": best, "wave": 0, "time": 0.0}]} if best > 0 else {}
+
+    def _error(self, msg):
+        self.errors.append(msg)
+        print(f"scores: {msg}", file=sys.stderr)
+
+    def _run(self):
+        try:
+            self._load()
+        finally:
+            # never leave best() / submit() / top() waiting on a load that died
+            self.loaded.set()
+        if self.on_load: self.on_load(self)
+        while True:
+            self.wake.wait()
+            with self.lock:
+                self.wake.clear()
+                snap, self.pending = self.pending, None
+                files, self.files = self.files, {}
+                closing = self.closing
+            for path, data in files.items():
+                try:
+                    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                    atomic_write(path, data)
+                except OSError as e:
+                    self._error(f"could not save {path}: {e}")
+            if snap is not None:
+                boards, best = snap
+                try:
+                    atomic_write(self.path, json.dumps({"version": 1, "boards": boards}, indent=1).encode())
+                    atomic_write(self.legacy, str(best).encode())
+                except OSError as e:
+                    self._error(f"could not save: {e}")
+            if closing: return
+
+    def top(self, difficulty):
+        self.loaded.wait()
+        with self.lock:
+            return list(self.boards.get(difficulty, ()))
+
+    def best(self, difficulty=None):
+        self.loaded.wait()
+        with self.lock:
+            boards = [self.boards.get(difficulty, ())] if difficulty else self.boards.values()
+            return max((r["score"] for rows in boards for r in rows), default=0)
+
+    def submit(self, difficulty, score, wave):
+        # returns the 1-based rank on that board, or 0 if it didn't place
+        self.loaded.wait()
+        row = {"score": int(score), "wave": int(wave), "time": time.time()}
+        with self.lock:
+            rows = self.boards.setdefault(difficulty, [])
+            rank = next((i for i, r in enumerate(rows) if score > r["score"]), len(rows))
+            if rank >= self.size: return 0
+            rows.insert(rank, row)
+            del rows[self.size:]
+            best = max(r["score"] for b in self.boards.values() for r in b)
+            self.pending = ({d: [dict(r) for r in b] for d, b in self.boards.items()}, best)
+            self.wake.set()
+        return rank + 1
+
+    def write(self, path, data):
+        with self.lock:
+            self.files[path] = data
+            self.wake.set()
+
+    def close(self, timeout=2.0):
+        # flush the last snapshot and queued files on quit
+        with self.lock:
+            self.closing = True
+            self.wake.set()
+        self.thread.join(timeout)
 
 class SoundManager:
-    def __init__(self, enabled: bool):
+    def __init__(self, enabled: bool, background=False):
+        # background=True opens the mixer and builds the clips on a worker thread;
+        # play() is a no-op until they are ready
         self.enabled = enabled
         self.ok = False
         self.sounds = {}
+        self.timings = {}
+        self.cache_hits = 0
+        self.thread = None
         if not enabled:
             return
+        if background:
+            self.thread = threading.Thread(target=self._load, name="sound-init", daemon=True)
+            self.thread.start()
+        else:
+            self._load()
+
+    def _load(self):
+        t0 = time.perf_counter()
         try:
+            # pygame.init() may already have opened the mixer in stereo; the buffers below are mono
+            if pygame.mixer.get_init() not in (None, (SAMPLE_RATE, -16, 1)):
+                pygame.mixer.quit()
             pygame.mixer.pre_init(SAMPLE_RATE, size=-16, channels=1, buffer=512)
             pygame.mixer.init()
             pygame.mixer.set_num_channels(10)
-            self.ok = True
         except Exception:
             self.enabled = False
             self.ok = False
             return
-        self.sounds["shoot"] = self._tone(880, 0.045, amp=0.40)
-        self.sounds["hit"] = self._tone(210, 0.12, amp=0.50)
-        self.sounds["boom"] = self._noise(0.16, amp=0.40)
-        self.sounds["power"] = self._tone(520, 0.09, amp=0.45)
-        self.sounds["boss"] = self._tone(320, 0.20, amp=0.45)
-        for s in self.sounds.values():
+        t1 = time.perf_counter()
+        sounds = {
+            "shoot": self._tone(880, 0.045, amp=0.40),
+            "hit": self._tone(210, 0.12, amp=0.50),
+            "boom": self._noise(0.16, amp=0.40),
+            "power": self._tone(520, 0.09, amp=0.45),
+            "boss": self._tone(320, 0.20, amp=0.45),
+        }
+        for s in sounds.values():
             s.set_volume(MASTER_VOLUME * SFX_VOLUME)
+        t2 = time.perf_counter()
+        self.timings = {"mixer_init": t1 - t0, "buffers": t2 - t1}
+        self.sounds = sounds
+        self.ok = True
+
+    def report(self):
+        if self.thread is not None and self.thread.is_alive(): return "sound: still loading"
+        if not self.timings: return "sound: disabled"
+        return (f"sound: mixer init {self.timings['mixer_init'] * 1000:.1f} ms, "
+                f"buffers {self.timings['buffers'] * 1000:.1f} ms ({self.cache_hits}/{len(self.sounds)} from cache)")
+
+    @staticmethod
+    def _envelope(n, fade):
+        # linear fade-in over the first `fade` samples and fade-out over the last ones
+        i = np.arange(n, dtype=np.float64)
+        env = np.ones(n)
+        head = i < fade
+        env[head] = i[head] / fade
+        tail = i > n - fade
+        env[tail] *= np.maximum(0.0, (n - i[tail]) / fade)
+        return i, env
+
+    def _cached(self, key, synth):
+        # PCM buffers are keyed by their synthesis parameters and kept in SOUND_CACHE_DIR
+        path = os.path.join(SOUND_CACHE_DIR, key + ".pcm")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            self.cache_hits += 1
+        except OSError:
+            data = synth().astype("<i2").tobytes()
+            try:
+                os.makedirs(SOUND_CACHE_DIR, exist_ok=True)
+                tmp = path + ".tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError:
+                pass
+        return pygame.mixer.Sound(buffer=data)
 
     def _tone(self, freq_hz: float, duration: float, amp: float = 0.45):
         n = int(SAMPLE_RATE * duration)
-        buf = bytearray()
         fade = max(1, int(0.01 * SAMPLE_RATE))
-        for i in range(n):
-            t = i / SAMPLE_RATE
-            sample = math.sin(2 * math.pi * freq_hz * t)
-            if i < fade:
-                sample *= (i / fade)
-            if i > n - fade:
-                sample *= max(0.0, (n - i) / fade)
-            val = int(sample * amp * 32767)
-            buf += struct.pack("<h", val)
-        return pygame.mixer.Sound(buffer=bytes(buf))
+        def synth():
+            i, env = self._envelope(n, fade)
+            sample = np.sin(2 * math.pi * freq_hz * (i / SAMPLE_RATE)) * env
+            return (sample * amp * 32767).astype(np.int16)
+        return self._cached(f"tone_{freq_hz}_{duration}_{amp}_{SAMPLE_RATE}", synth)
 
     def _noise(self, duration: float, amp: float = 0.35):
         n = int(SAMPLE_RATE * duration)
-        buf = bytearray()
         fade = max(1, int(0.02 * SAMPLE_RATE))
-        for i in range(n):
-            sample = (random.random() * 2 - 1)
-            if i < fade:
-                sample *= (i / fade)
-            if i > n - fade:
-                sample *= max(0.0, (n - i) / fade)
-            val = int(sample * amp * 32767)
-            buf += struct.pack("<h", val)
-        return pygame.mixer.Sound(buffer=bytes(buf))
+        def synth():
+            _, env = self._envelope(n, fade)
+            sample = (np.random.default_rng().random(n) * 2 - 1) * env
+            return (sample * amp * 32767).astype(np.int16)
+        return self._cached(f"noise_{duration}_{amp}_{SAMPLE_RATE}", synth)
 
     def play(self, name: str):
         if self.enabled and self.ok and name in self.sounds:
@@ -151,109 +352,619 @@ class SoundManager:
             except Exception:
                 pass
 
-class Particle:
-    def __init__(self, pos, vel, life=PARTICLE_LIFE, radius=3, color=(255, 200, 80)):
-        self.pos = pygame.Vector2(pos)
-        self.vel = pygame.Vector2(vel)
-        self.life = life
-        self.max_life = life
-        self.radius = radius
-        self.color = color
-    def update(self, dt):
-        self.pos += self.vel * dt
-        self.vel *= (1.0 - 1.8 * dt)
-        self.life -= dt
-    def draw(self, surf, offset=(0, 0)):
-        if self.life <= 0: return
-        a = clamp(self.life / self.max_life, 0, 1)
-        r = max(1, int(self.radius * a))
-        pygame.draw.circle(surf, self.color, (int(self.pos.x + offset[0]), int(self.pos.y + offset[1])), r)
+# particle color indices into PARTICLE_COLORS
+PC_KILL, PC_SPARK, PC_HURT = range(3)
+PARTICLE_COLORS = ((255, 200, 80), (220, 240, 255), (255, 150, 150))
+
+class ParticleSystem:
+    # packed NumPy particle store (live particles sit in [0, n)); drawn by splatting
+    # per-radius disc masks straight into the surface's pixel buffer
+    def __init__(self, capacity=PARTICLE_CAPACITY, seed=None):
+        self.capacity = capacity
+        self.n = 0
+        self.x = np.zeros(capacity); self.y = np.zeros(capacity)
+        self.px = np.zeros(capacity); self.py = np.zeros(capacity)
+        self.vx = np.zeros(capacity); self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity); self.max_life = np.zeros(capacity)
+        self.radius = np.zeros(capacity, np.int32)
+        self.color = np.zeros(capacity, np.uint8)
+        self.seed = seed
+        self._rng = None
+        self._discs = {}
     @property
-    def dead(self): return self.life <= 0
-
-class Star:
-    def __init__(self):
-        self.reset()
-        self.x = random.uniform(0, WIDTH)
-    def reset(self):
-        self.x = WIDTH + random.uniform(0, WIDTH)
-        self.y = random.uniform(0, HEIGHT)
-        self.s = random.uniform(1.0, 3.2)
-        self.v = random.uniform(40, 140)
+    def rng(self):
+        # created on first emit: importing numpy.random costs several ms of startup
+        if self._rng is None: self._rng = np.random.default_rng(self.seed)
+        return self._rng
+    def __len__(self): return self.n
+    def clear(self): self.n = 0
+    def emit(self, x, y, vx, vy, life, radius, color):
+        k = min(len(vx), self.capacity - self.n)
+        if k <= 0: return
+        s = slice(self.n, self.n + k)
+        self.x[s] = x; self.y[s] = y
+        self.px[s] = x; self.py[s] = y
+        self.vx[s] = vx[:k]; self.vy[s] = vy[:k]
+        self.life[s] = life; self.max_life[s] = life
+        self.radius[s] = radius if np.isscalar(radius) else radius[:k]
+        self.color[s] = color
+        self.n += k
+    def radial(self, x, y, count, speed, life, radius, color):
+        # count particles flying out at uniform angles; speed=(lo, hi), radius=(lo, hi) inclusive
+        ang = self.rng.uniform(0, math.tau, count)
+        sp = self.rng.uniform(speed[0], speed[1], count)
+        self.emit(x, y, np.cos(ang) * sp, np.sin(ang) * sp, life, self.rng.integers(radius[0], radius[1] + 1, count), color)
+    def scatter(self, x, y, count, spread, life, radius, color):
+        # count particles with velocity uniform in [-spread, spread] on both axes
+        v = self.rng.uniform(-spread, spread, (2, count))
+        self.emit(x, y, v[0], v[1], life, radius, color)
+    def update(self, dt):
+        n = self.n
+        if n == 0: return
+        vx, vy, life = self.vx[:n], self.vy[:n], self.life[:n]
+        self.px[:n] = self.x[:n]; self.py[:n] = self.y[:n]
+        self.x[:n] += vx * dt; self.y[:n] += vy * dt
+        damp = 1.0 - 1.8 * dt
+        vx *= damp; vy *= damp
+        life -= dt
+        keep = life > 0
+        k = int(np.count_nonzero(keep))
+        if k < n:
+            for a in (self.x, self.y, self.px, self.py, self.vx, self.vy, self.life, self.max_life, self.radius, self.color):
+                a[:k] = a[:n][keep]
+            self.n = k
+    def _disc(self, r):
+        # pixel offsets pygame.draw.circle covers for radius r, so splats match the circle path exactly
+        d = self._discs.get(r)
+        if d is None:
+            s = pygame.Surface((2 * r + 3, 2 * r + 3), pygame.SRCALPHA)
+            pygame.draw.circle(s, (255, 255, 255), (r + 1, r + 1), r)
+            dx, dy = np.nonzero(pygame.surfarray.array_alpha(s))
+            d = self._discs[r] = (dx - r - 1, dy - r - 1)
+        return d
+    def draw(self, surf, offset=(0, 0), alpha=1.0, src=None):
+        # src: any store with the same fields (a Snapshot's copy); defaults to the live particles
+        src = src or self
+        n = src.n
+        if n == 0: return
+        a = np.clip(src.life[:n] / src.max_life[:n], 0, 1)
+        rad = np.maximum(1, (src.radius[:n] * a).astype(np.int32))
+        x, y = src.x[:n], src.y[:n]
+        if alpha < 1.0:
+            x = src.px[:n] + (x - src.px[:n]) * alpha
+            y = src.py[:n] + (y - src.py[:n]) * alpha
+        xs = (x + offset[0]).astype(np.int64)
+        ys = (y + offset[1]).astype(np.int64)
+        color = src.color[:n]
+        if surf.get_bytesize() != 4:
+            for x, y, r, c in zip(xs.tolist(), ys.tolist(), rad.tolist(), color.tolist()):
+                pygame.draw.circle(surf, PARTICLE_COLORS[c], (x, y), r)
+            return
+        w, h = surf.get_size()
+        stride = surf.get_pitch() // 4
+        mapped = np.array([surf.map_rgb(c) for c in PARTICLE_COLORS], np.uint32)[color]
+        view = surf.get_view("1")
+        pix = np.frombuffer(view, np.uint32)
+        for r in np.unique(rad).tolist():
+            sel = rad == r
+            dx, dy = self._disc(r)
+            px, py, pc = xs[sel], ys[sel], mapped[sel]
+            inside = (px > r) & (px < w - r - 1) & (py > r) & (py < h - r - 1)
+            if inside.any():
+                base = py[inside] * stride + px[inside]
+                pix[(base[:, None] + (dy * stride + dx)).ravel()] = np.repeat(pc[inside], dx.size)
+            if not inside.all():
+                out = ~inside
+                X = (px[out][:, None] + dx).ravel(); Y = (py[out][:, None] + dy).ravel()
+                ok = (X >= 0) & (X < w) & (Y >= 0) & (Y < h)
+                pix[Y[ok] * stride + X[ok]] = np.repeat(pc[out], dx.size)[ok]
+        del pix, view
+
+class Starfield:
+    # parallax background: stars are binned by speed into a few tileable layers rendered once,
+    # then each layer is blitted twice per frame at its own scroll offset, whatever the star count
+    COLOR = (200, 200, 220)
+    SPEED_RANGE = (40.0, 140.0)
+    def __init__(self, rng=random, count=STAR_COUNT, layers=STAR_LAYERS):
+        lo, hi = self.SPEED_RANGE
+        band = (hi - lo) / layers
+        self.speeds = [lo + band * (k + 0.5) for k in range(layers)]
+        self.surfs = [pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA) for _ in range(layers)]
+        self.converted = False
+        # a star crosses ~1.5 screen widths per lap, so about 2/3 of them are on screen at once
+        for _ in range(round(count * 2 / 3)):
+            x, y = int(rng.uniform(0, WIDTH)), int(rng.uniform(0, HEIGHT))
+            r = int(rng.uniform(1.0, 3.2))
+            k = min(layers - 1, int((rng.uniform(lo, hi) - lo) / band))
+            for wx in (x - WIDTH, x, x + WIDTH):
+                pygame.draw.circle(self.surfs[k], self.COLOR, (wx, y), r)
+        self.scroll = [0.0] * layers
+        self.prev = [0.0] * layers
+        self.visible = layers
     def update(self, dt, speed_mul=1.0):
-        self.x -= self.v * speed_mul * dt
-        if self.x < -10:
-            self.reset()
-    def draw(self, surf, offset=(0, 0)):
-        pygame.draw.circle(surf, (200, 200, 220), (int(self.x + offset[0]), int(self.y + offset[1])), int(self.s))
+        for k, v in enumerate(self.speeds):
+            self.prev[k] = self.scroll[k]
+            self.scroll[k] += v * speed_mul * dt
+    def draw(self, surf, offset=(0, 0), alpha=1.0, state=None):
+        # state: (scroll, prev, visible) as captured in a Snapshot; defaults to the live values
+        if not self.converted and pygame.display.get_surface() is not None:
+            self.surfs = [s.convert_alpha() for s in self.surfs]
+            for s in self.surfs: s.set_alpha(255, pygame.RLEACCEL)
+            self.converted = True
+        scroll, prev, visible = state or (self.scroll, self.prev, self.visible)
+        ox, oy = int(offset[0]), int(offset[1])
+        seq = []
+        for k in range(visible):
+            p = prev[k] + (scroll[k] - prev[k]) * alpha
+            x = ox - int(p) % WIDTH
+            seq.append((self.surfs[k], (x, oy)))
+            seq.append((self.surfs[k], (x + WIDTH, oy)))
+        surf.blits(seq, doreturn=False)
+
+# bullet color indices into BULLET_COLORS
+BC_PLAYER, BC_SPREAD, BC_SHOOTER, BC_BOSS_FAN, BC_BOSS_AIM, BC_BOSS_RING = range(6)
+BULLET_COLORS = ((220, 240, 255), (200, 255, 220), (255, 210, 120), (255, 140, 140), (255, 200, 90), (200, 160, 255))
+
+# boss bullet patterns: a pattern is a list of stages played in a loop (a stage with "time": None
+# lasts forever); each emitter fires a volley every `every` seconds after an initial `delay`.
+#   fan    count bullets spread evenly over `spread` degrees around straight left
+#   ring   count bullets around a full circle, rotated by `offset` degrees
+#   spiral ring of `count` arms that turns `step` whole degrees per volley
+#   aimed  count bullets over `spread` degrees centred on the player
+# speed is a multiple of ENEMY_BULLET_SPEED and `cooldowns` (instead of `every`) a multiple of BOSS_FIRE_COOLDOWN,
+# both read when the pattern compiles; `gate` g fires only during the first g of every 2g seconds
+BOSS_PATTERNS = {
+    "classic": [
+        {"time": None, "emitters": [
+            {"kind": "fan", "count": 5, "spread": 52, "speed": 1.10, "cooldowns": 1.0, "delay": 0.9, "color": BC_BOSS_FAN},
+            {"kind": "aimed", "count": 1, "speed": 1.25, "cooldowns": 1.0, "delay": 0.9, "gate": 1.0, "color": BC_BOSS_AIM},
+        ]},
+    ],
+    "spiral": [
+        {"time": 6.0, "emitters": [
+            {"kind": "spiral", "count": 4, "step": 11, "speed": 0.80, "every": 0.10, "delay": 0.9, "color": BC_BOSS_RING},
+        ]},
+        {"time": 4.0, "emitters": [
+            {"kind": "fan", "count": 9, "spread": 80, "speed": 1.05, "every": 0.32, "delay": 0.3, "color": BC_BOSS_FAN},
+            {"kind": "aimed", "count": 3, "spread": 16, "speed": 1.30, "every": 0.64, "delay": 0.5, "color": BC_BOSS_AIM},
+        ]},
+    ],
+    "storm": [
+        {"time": 5.0, "emitters": [
+            {"kind": "ring", "count": 28, "speed": 0.75, "every": 0.45, "delay": 0.9, "color": BC_BOSS_RING},
+            {"kind": "ring", "count": 28, "offset": 6.4, "speed": 0.75, "every": 0.45, "delay": 1.125, "color": BC_BOSS_RING},
+        ]},
+        {"time": 5.0, "emitters": [
+            {"kind": "spiral", "count": 6, "step": 7, "speed": 0.85, "every": 0.07, "delay": 0.4, "color": BC_BOSS_RING},
+            {"kind": "aimed", "count": 5, "spread": 30, "speed": 1.35, "every": 0.5, "delay": 0.6, "color": BC_BOSS_AIM},
+        ]},
+    ],
+}
 
-class Bullet:
-    def __init__(self, pos, vel, friendly=True, radius=4, color=(220, 240, 255)):
-        self.pos = pygame.Vector2(pos)
-        self.vel = pygame.Vector2(vel)
-        self.friendly = friendly
-        self.radius = radius
-        self.color = color
-        self.life = BULLET_LIFETIME
+class BulletPool:
+    # fixed-capacity structure-of-arrays bullet store; dead slots go back on a free stack
+    def __init__(self, capacity=BULLET_CAPACITY):
+        self.capacity = capacity
+        self.x = np.zeros(capacity); self.y = np.zeros(capacity)
+        self.px = np.zeros(capacity); self.py = np.zeros(capacity)
+        self.vx = np.zeros(capacity); self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity)
+        self.radius = np.zeros(capacity, np.int32)
+        self.color = np.zeros(capacity, np.uint8)
+        self.friendly = np.zeros(capacity, bool)
+        self.alive = np.zeros(capacity, bool)
+        self.seq = np.zeros(capacity, np.int64)
+        self.free = np.arange(capacity - 1, -1, -1)
+        self.nfree = capacity
+        self.next_seq = 0
+        self._dead = np.zeros(capacity, bool)
+        self._tmp = np.zeros(capacity)
+    def __len__(self): return self.capacity - self.nfree
+    def clear(self):
+        self.alive[:] = False
+        self.vx[:] = 0; self.vy[:] = 0
+        self.free[:] = np.arange(self.capacity - 1, -1, -1)
+        self.nfree = self.capacity
+    def spawn(self, x, y, vx, vy, friendly, radius, color):
+        if self.nfree == 0: return -1
+        self.nfree -= 1
+        i = int(self.free[self.nfree])
+        self.x[i] = self.px[i] = x; self.y[i] = self.py[i] = y
+        self.vx[i] = vx; self.vy[i] = vy
+        self.life[i] = BULLET_LIFETIME
+        self.radius[i] = radius; self.color[i] = color
+        self.friendly[i] = friendly; self.alive[i] = True
+        self.seq[i] = self.next_seq; self.next_seq += 1
+        return i
+    def spawn_many(self, x, y, vx, vy, friendly, radius, color):
+        # vectorized spawn(); slots and seq numbers come out exactly as len(x) spawn() calls would give
+        k = min(len(x), self.nfree)
+        if k <= 0: return
+        idx = self.free[self.nfree - k:self.nfree][::-1]
+        self.nfree -= k
+        self.x[idx] = self.px[idx] = x[:k]; self.y[idx] = self.py[idx] = y[:k]
+        self.vx[idx] = vx[:k]; self.vy[idx] = vy[:k]
+        self.life[idx] = BULLET_LIFETIME
+        self.radius[idx] = radius; self.color[idx] = color
+        self.friendly[idx] = friendly; self.alive[idx] = True
+        self.seq[idx] = np.arange(self.next_seq, self.next_seq + k)
+        self.next_seq += k
     def update(self, dt):
-        self.pos += self.vel * dt
+        if self.nfree == self.capacity: return
+        np.copyto(self.px, self.x); np.copyto(self.py, self.y)
+        np.multiply(self.vx, dt, out=self._tmp); self.x += self._tmp
+        np.multiply(self.vy, dt, out=self._tmp); self.y += self._tmp
         self.life -= dt
-    @property
-    def dead(self):
-        return self.life <= 0 or self.pos.x < -50 or self.pos.x > WIDTH + 50 or self.pos.y < -50 or self.pos.y > HEIGHT + 50
-    def draw(self, surf, offset=(0, 0)):
-        pygame.draw.circle(surf, self.color, (int(self.pos.x + offset[0]), int(self.pos.y + offset[1])), self.radius)
-    def collides_circle(self, center, r):
-        return self.pos.distance_to(center) <= (self.radius + r)
+        dead = self._dead
+        np.less_equal(self.life, 0, out=dead)
+        dead |= self.x < -50; dead |= self.x > WIDTH + 50
+        dead |= self.y < -50; dead |= self.y > HEIGHT + 50
+        dead &= self.alive
+        idx = np.flatnonzero(dead)
+        if idx.size:
+            self.alive[idx] = False
+            self.vx[idx] = 0; self.vy[idx] = 0
+            self.free[self.nfree:self.nfree + idx.size] = idx
+            self.nfree += idx.size
+    def ordered(self, mask):
+        # slot indices under mask, in spawn order
+        idx = np.flatnonzero(mask)
+        return idx[np.argsort(self.seq[idx], kind="stable")]
+    def draw(self, surf, offset=(0, 0), alpha=1.0, atlas=None, src=None):
+        # src: a Snapshot's packed copy of the live bullets; defaults to this pool
+        ox, oy = offset
+        if src is None:
+            idx = np.flatnonzero(self.alive)
+            xs, ys, px, py, rad, col = self.x[idx], self.y[idx], self.px, self.py, self.radius[idx], self.color[idx]
+        else:
+            idx = slice(0, src.n)
+            xs, ys, px, py, rad, col = src.x[idx], src.y[idx], src.px, src.py, src.radius[idx], src.color[idx]
+        if alpha < 1.0:
+            xs = px[idx] + (xs - px[idx]) * alpha
+            ys = py[idx] + (ys - py[idx]) * alpha
+        if atlas is not None:
+            # sprites for bullet radius r are anchored at (r + 2, r + 2)
+            dx = (xs + ox).astype(np.int64) - rad - 2
+            dy = (ys + oy).astype(np.int64) - rad - 2
+            keys = (col.astype(np.int64) * 8 + rad).tolist()
+            surf.blits(list(zip(map(atlas.bullets.__getitem__, keys), zip(dx.tolist(), dy.tolist()))), doreturn=False)
+            return
+        for x, y, r, c in zip(xs.tolist(), ys.tolist(), rad.tolist(), col.tolist()):
+            pygame.draw.circle(surf, BULLET_COLORS[c], (int(x + ox), int(y + oy)), r)
+
+class Emitter:
+    # one compiled pattern emitter: velocity tables are built once, so firing a volley is a single
+    # BulletPool.spawn_many over a table row (aimed emitters rotate a precomputed cos/sin table)
+    def __init__(self, spec):
+        self.kind = spec["kind"]
+        self.every = spec["every"] if "every" in spec else spec["cooldowns"] * BOSS_FIRE_COOLDOWN
+        self.delay = spec.get("delay", self.every)
+        self.gate = spec.get("gate", 0.0)
+        self.radius = spec.get("radius", 5)
+        if not 1 <= self.radius <= BULLET_MAX_RADIUS:
+            # the sprite atlas and the collision grid's padding only cover radii up to BULLET_MAX_RADIUS
+            raise ValueError(f"emitter radius {self.radius} outside 1..{BULLET_MAX_RADIUS}")
+        self.color = spec["color"]
+        self.speed = spec["speed"] * ENEMY_BULLET_SPEED
+        count = spec["count"]
+        if self.kind == "aimed":
+            spread = spec.get("spread", 0.0)
+            offs = [spread * (i / (count - 1) - 0.5) if count > 1 else 0.0 for i in range(count)]
+            self.cos = np.array([math.cos(math.radians(a)) for a in offs])
+            self.sin = np.array([math.sin(math.radians(a)) for a in offs])
+            return
+        if self.kind == "fan":
+            spread = spec["spread"]
+            rows = [[spread * (i / (count - 1) - 0.5) if count > 1 else 0.0 for i in range(count)]]
+        elif self.kind == "ring":
+            rows = [[spec.get("offset", 0.0) + 360.0 * i / count for i in range(count)]]
+        elif self.kind == "spiral":
+            step = int(spec["step"])
+            rows = [[k * step + 360.0 * i / count for i in range(count)] for k in range(360 // math.gcd(step, 360))]
+        else:
+            raise ValueError(f"unknown emitter kind {self.kind!r}")
+        # same construction as the original hand-written fan, so its velocities are bit-identical
+        vel = [[pygame.Vector2(-1, 0).rotate(a) * self.speed for a in row] for row in rows]
+        self.vx = np.array([[v.x for v in row] for row in vel])
+        self.vy = np.array([[v.y for v in row] for row in vel])
+
+    def fire(self, bullets, x, y, aim, volley):
+        if self.kind == "aimed":
+            ux, uy = aim
+            vx = (ux * self.cos - uy * self.sin) * self.speed
+            vy = (ux * self.sin + uy * self.cos) * self.speed
+        else:
+            row = volley % len(self.vx)
+            vx, vy = self.vx[row], self.vy[row]
+        n = len(vx)
+        bullets.spawn_many(np.full(n, x), np.full(n, y), vx, vy, False, self.radius, self.color)
+
+class BossPattern:
+    def __init__(self, stages, name=""):
+        self.name = name
+        self.stages = [(st["time"], [Emitter(e) for e in st["emitters"]]) for st in stages]
+
+_PATTERN_CACHE = {}
+
+def boss_pattern(name):
+    # patterns compile on first use and are shared by every boss that flies them; keyed on the constants
+    # they bake in, so a changed BOSS_FIRE_COOLDOWN / ENEMY_BULLET_SPEED (batch.py --set) recompiles
+    key = (name, BOSS_FIRE_COOLDOWN, ENEMY_BULLET_SPEED)
+    if key not in _PATTERN_CACHE: _PATTERN_CACHE[key] = BossPattern(BOSS_PATTERNS[name], name)
+    return _PATTERN_CACHE[key]
+
+def boss_pattern_for_wave(wave):
+    for item in wave_plan(wave)["timeline"]:
+        if "boss" in item: return item["boss"]
+    return "classic"
+
+# wave content lives in WAVES_FILE: {"waves": [rule, ...]}. A rule applies from wave "from" on (only every
+# "every" waves if given) and sets any of
+#   shooters  chance that a stream spawn is a shooter
+#   timeline  cues at "at" seconds into the wave: {"boss": pattern, "repeat": bool} starts the boss warning
+#             (repeat: again after each kill until the wave ends), {"spawn": "chaser" | "shooter", "count": n,
+#             "y": y or [y_first, y_last], "gap": px} brings in a formation, members gap px apart in x
+# later rules override earlier ones field by field
+WAVE_RULES = None
+_WAVE_PLANS = {}
+
+def load_waves(path=WAVES_FILE):
+    global WAVE_RULES
+    with open(path) as f:
+        rules = json.load(f)["waves"]
+    for rule in rules:
+        for item in rule.get("timeline", ()):
+            if "boss" in item:
+                if item["boss"] not in BOSS_PATTERNS: raise ValueError(f"{path}: unknown boss pattern {item['boss']!r}")
+            elif item.get("spawn") not in ("chaser", "shooter"):
+                raise ValueError(f"{path}: timeline cue needs \"boss\" or \"spawn\": chaser/shooter, got {item!r}")
+    WAVE_RULES = rules
+    _WAVE_PLANS.clear()
+
+def wave_plan(wave):
+    # the merged rules for one wave, built once per wave number
+    plan = _WAVE_PLANS.get(wave)
+    if plan is None:
+        if WAVE_RULES is None: load_waves()
+        plan = {"shooters": 0.0, "timeline": []}
+        for rule in WAVE_RULES:
+            start, every = rule.get("from", 1), rule.get("every")
+            if wave < start or (every and (wave - start) % every): continue
+            plan.update((k, v) for k, v in rule.items() if k not in ("from", "every"))
+        _WAVE_PLANS[wave] = plan
+    return plan
+
+class WaveParams:
+    # everything spawning and scrolling read during a wave, computed once when the wave starts
+    __slots__ = ("scaler", "spawn_rate", "enemy_speed", "enemy_hp", "power_rate", "star_speed", "shooters", "timeline")
+    def __init__(self, wave, difficulty):
+        cfg = DIFFICULTIES[difficulty]
+        scaler = self.scaler = 1.0 if not FEATURES["WAVES"] else 1.0 + (wave - 1) * WAVE_SCALE_STEP
+        self.spawn_rate = (ENEMY_SPAWN_BASE / scaler) * cfg["spawn_mul"]
+        self.enemy_speed = ENEMY_BASE_SPEED * cfg["enemy_mul"] * (1.0 + (scaler - 1) * 0.65)
+        self.enemy_hp = int(ENEMY_HP * cfg["enemy_mul"] * (1.0 + (scaler - 1) * 0.55))
+        self.power_rate = POWERUP_SPAWN_BASE * (0.95 + scaler * 0.18)
+        self.star_speed = 1.0 + (scaler - 1) * 0.25
+        plan = wave_plan(wave)
+        self.shooters, self.timeline = plan["shooters"], plan["timeline"]
+
+class SpatialGrid:
+    # uniform-grid broadphase, rebuilt every frame; query() returns indices in insertion order.
+    # build(pad=r) grows every item by r so a point query of radius <= r only needs its own cell.
+    STRIDE = 1 << 16
+    def __init__(self, cell=64):
+        self.cell = cell
+        self.cells = {}
+    def key(self, cx, cy): return cx * self.STRIDE + cy
+    def build(self, items, pad=0):
+        self.cells.clear()
+        c, st = self.cell, self.STRIDE
+        for i, it in enumerate(items):
+            x, y, r = it.pos.x, it.pos.y, it.radius + pad
+            x0, x1 = math.floor((x - r) / c), math.floor((x + r) / c)
+            y0, y1 = math.floor((y - r) / c), math.floor((y + r) / c)
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self.cells.setdefault(cx * st + cy, []).append(i)
+    def query(self, x, y, r):
+        c, st = self.cell, self.STRIDE
+        x0, x1 = math.floor((x - r) / c), math.floor((x + r) / c)
+        y0, y1 = math.floor((y - r) / c), math.floor((y + r) / c)
+        if x0 == x1 and y0 == y1:
+            return self.cells.get(x0 * st + y0, ())
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                found.update(self.cells.get(cx * st + cy, ()))
+        return sorted(found)
+    def point_keys(self, xs, ys):
+        c = float(self.cell)
+        return np.floor(xs / c).astype(np.int64) * self.STRIDE + np.floor(ys / c).astype(np.int64)
+    def occupied(self): return np.fromiter(self.cells, np.int64, len(self.cells))
+
+class SimClock:
+    # millisecond clock advanced by Game.update; stands in for pygame.time.get_ticks()
+    def __init__(self): self.ms = 0.0
+    def advance(self, dt): self.ms += dt * 1000.0
+    def get_ticks(self): return int(self.ms)
+
+# Scheduler event kinds. SPAWN..COMBO are one-per-game timers (Game.timers); SHOT a = shooter seq,
+# CUE a, b = wave, timeline index
+T_WAVE, T_SPAWN, T_POWER, T_BOSS, T_COMBO, T_SHOT, T_CUE = range(7)
+T_SINGLE = (T_WAVE, T_SPAWN, T_POWER, T_BOSS, T_COMBO)
+
+class Scheduler:
+    # simulation timers as one min-heap of [due, order, kind, a, b] entries on the Game.time clock:
+    # a step pops only what is due (O(log n) each) and costs nothing for timers still waiting.
+    # order breaks ties, so the pop order is fully determined by the entries (saved states rely on it).
+    # cancel() kills an entry in place (kind = None); it is discarded when it reaches the top.
+    def __init__(self):
+        self.now = 0.0
+        self.heap = []
+        self.order = 0
+    def __len__(self): return len(self.heap)
+    def clear(self, now=0.0):
+        self.now = now
+        self.heap.clear()
+        self.order = 0
+    def at(self, due, kind, a=0, b=0):
+        entry = [due, self.order, kind, a, b]
+        self.order += 1
+        heapq.heappush(self.heap, entry)
+        return entry
+    def after(self, delay, kind, a=0, b=0): return self.at(self.now + delay, kind, a, b)
+    @staticmethod
+    def cancel(entry):
+        if entry is not None: entry[2] = None
+    @staticmethod
+    def pending(entry): return entry is not None and entry[2] is not None
+    def left(self, entry): return entry[0] - self.now if self.pending(entry) else 0.0
+    def due(self, now):
+        # (due, kind, a, b) for every live entry due at or before now, in order; entries pushed
+        # meanwhile that are already due come out in the same pass
+        self.now = now
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            e = heapq.heappop(heap)
+            kind = e[2]
+            if kind is None: continue
+            e[2] = None
+            yield e[0], kind, e[3], e[4]
+    def live(self): return sorted(e for e in self.heap if e[2] is not None)
+    def restore(self, now, order, entries):
+        self.now, self.order = now, order
+        self.heap[:] = [list(e) for e in entries]
+        heapq.heapify(self.heap)
+
+IN_UP, IN_DOWN, IN_LEFT, IN_RIGHT, IN_SHOOT, IN_SLOW = 1, 2, 4, 8, 16, 32
+
+class InputState:
+    # key lookup backed by an input bitmask; drop-in for pygame.key.get_pressed() in Game.update
+    KEYMAP = {
+        pygame.K_UP: IN_UP, pygame.K_w: IN_UP, pygame.K_DOWN: IN_DOWN, pygame.K_s: IN_DOWN,
+        pygame.K_LEFT: IN_LEFT, pygame.K_a: IN_LEFT, pygame.K_RIGHT: IN_RIGHT, pygame.K_d: IN_RIGHT,
+        pygame.K_SPACE: IN_SHOOT, pygame.K_LSHIFT: IN_SLOW, pygame.K_RSHIFT: IN_SLOW,
+    }
+    def __init__(self, bits=0): self.bits = bits
+    def __getitem__(self, key): return bool(self.bits & self.KEYMAP.get(key, 0))
+    @classmethod
+    def from_pressed(cls, pressed):
+        bits = 0
+        for k, b in cls.KEYMAP.items():
+            if pressed[k]: bits |= b
+        return cls(bits)
+
+# menu/pause commands; main() turns key presses into these so replays can re-issue them
+EV_EASY, EV_NORMAL, EV_HARD, EV_START, EV_PAUSE, EV_RESUME, EV_RESTART = range(1, 8)
+EV_DIFFICULTY = {EV_EASY: "Easy", EV_NORMAL: "Normal", EV_HARD: "Hard"}
+# quality settings the governor may change: name -> allowed levels, floor first, ceiling last;
+# a change is the command EV_QUALITY + index * 32 + level so replays see it too
+QUALITY_LEVELS = {
+    "kill_particles": (4, 8, 12, 18),
+    "hit_particles": (4, 8, 12),
+    "banner_panels": (0, 1),
+    "star_layers": tuple(range(max(1, STAR_LAYERS // 2), STAR_LAYERS + 1)),
+}
+QUALITY_NAMES = tuple(QUALITY_LEVELS)
+EV_QUALITY = 64
+
+def scripted_input(frame, game):
+    # default headless pilot: hold fire and sweep up and down once every 2 s
+    return InputState(IN_SHOOT | (IN_UP if (frame // 60) % 2 else IN_DOWN))
+
+def bot_input(frame, game):
+    # dodge-and-shoot pilot for batch runs: hold fire, line up with the nearest enemy ahead,
+    # and sidestep any hostile bullet predicted to cross the ship within the next 0.6 s
+    p, bp = game.player, game.bullets
+    px, py = p.pos.x, p.pos.y
+    bits = IN_SHOOT
+    target = py
+    best = None
+    for e in game.enemies:
+        if e.pos.x > px and (best is None or e.pos.x < best.pos.x): best = e
+    if best is not None: target = best.pos.y
+    hostile = bp.alive & ~bp.friendly
+    if hostile.any():
+        x, y, vx, vy = bp.x[hostile], bp.y[hostile], bp.vx[hostile], bp.vy[hostile]
+        t = np.where(vx < -1.0, (x - px) / np.maximum(-vx, 1.0), np.inf)
+        danger = (t >= 0) & (t < 0.6)
+        if danger.any():
+            hit_y = y[danger] + vy[danger] * t[danger]
+            close = np.abs(hit_y - py) < p.radius + 16
+            if close.any():
+                threat = float(hit_y[close][np.argmin(t[danger][close])])
+                room_up, room_down = py - 40, HEIGHT - 40 - py
+                up = threat > py if min(room_up, room_down) > 60 else room_up > room_down
+                target = py - 120 if up else py + 120
+    for e in game.enemies:
+        if isinstance(e, EnemyChaser) and 0 < e.pos.x - px < 140 and abs(e.pos.y - py) < 40:
+            target = py + (120 if e.pos.y < py else -120)
+    if target < py - 6: bits |= IN_UP
+    elif target > py + 6: bits |= IN_DOWN
+    if px > WIDTH * 0.2: bits |= IN_LEFT
+    return InputState(bits)
 
 class Player:
-    def __init__(self):
+    # i-frames, power-ups and the fire cooldown are deadlines on the game's Scheduler clock, so nothing
+    # counts down per frame; iframes / rapid_time / spread_time read (and set) the seconds left
+    __slots__ = ("pos", "prev", "hp", "shield", "sched", "iframes_until", "rapid_until", "spread_until", "fire_at")
+    def __init__(self, sched=None):
         self.pos = pygame.Vector2(WIDTH * 0.18, HEIGHT * 0.5)
+        self.prev = pygame.Vector2(self.pos)
         self.hp = PLAYER_MAX_HP
-        self.iframes = 0.0
         self.shield = 0
-        self.rapid_time = 0.0
-        self.spread_time = 0.0
-        self.fire_cd = 0.0
+        self.sched = sched if sched is not None else Scheduler()
+        now = self.sched.now
+        self.iframes_until = self.rapid_until = self.spread_until = self.fire_at = now
     @property
     def radius(self): return PLAYER_RADIUS
     @property
     def alive(self): return self.hp > 0
+    @property
+    def iframes(self): return max(0.0, self.iframes_until - self.sched.now)
+    @iframes.setter
+    def iframes(self, t): self.iframes_until = self.sched.now + t
+    @property
+    def rapid_time(self): return max(0.0, self.rapid_until - self.sched.now)
+    @rapid_time.setter
+    def rapid_time(self, t): self.rapid_until = self.sched.now + t
+    @property
+    def spread_time(self): return max(0.0, self.spread_until - self.sched.now)
+    @spread_time.setter
+    def spread_time(self, t): self.spread_until = self.sched.now + t
     def update(self, dt, keys):
-        self.iframes = max(0.0, self.iframes - dt)
-        self.rapid_time = max(0.0, self.rapid_time - dt)
-        self.spread_time = max(0.0, self.spread_time - dt)
         slow = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
         speed = PLAYER_SPEED * (PLAYER_SLOW_MULT if slow else 1.0)
         dx = (keys[pygame.K_d] or keys[pygame.K_RIGHT]) - (keys[pygame.K_a] or keys[pygame.K_LEFT])
         dy = (keys[pygame.K_s] or keys[pygame.K_DOWN]) - (keys[pygame.K_w] or keys[pygame.K_UP])
-        v = pygame.Vector2(dx, dy)
-        if v.length_squared() > 0: v = v.normalize() * speed
-        self.pos += v * dt
+        if dx or dy:
+            n = math.sqrt(dx * dx + dy * dy)
+            self.pos.x += dx / n * speed * dt
+            self.pos.y += dy / n * speed * dt
         self.pos.x = clamp(self.pos.x, 40, WIDTH - 40)
         self.pos.y = clamp(self.pos.y, 40, HEIGHT - 40)
-        self.fire_cd = max(0.0, self.fire_cd - dt)
     def can_shoot(self):
-        cd = FIRE_COOLDOWN * (0.55 if self.rapid_time > 0 else 1.0)
-        return self.fire_cd <= 0.0, cd
+        now = self.sched.now
+        cd = FIRE_COOLDOWN * (0.55 if self.rapid_until > now else 1.0)
+        return self.fire_at <= now, cd
     def shoot(self, bullets, sound: SoundManager):
         ok, cd = self.can_shoot()
         if not ok: return
-        self.fire_cd = cd
-        base = pygame.Vector2(BULLET_SPEED, 0)
-        bullets.append(Bullet(self.pos + (18, 0), base, True, 4, (220, 240, 255)))
-        if self.spread_time > 0:
+        self.fire_at = self.sched.now + cd
+        x, y = self.pos.x + 18, self.pos.y
+        bullets.spawn(x, y, BULLET_SPEED, 0.0, True, 4, BC_PLAYER)
+        if self.spread_until > self.sched.now:
             ang = math.radians(14)
             v1 = pygame.Vector2(BULLET_SPEED, 0).rotate_rad(ang)
             v2 = pygame.Vector2(BULLET_SPEED, 0).rotate_rad(-ang)
-            bullets.append(Bullet(self.pos + (18, -2), v1, True, 4, (200, 255, 220)))
-            bullets.append(Bullet(self.pos + (18, 2), v2, True, 4, (200, 255, 220)))
+            bullets.spawn(x, y - 2, v1.x, v1.y, True, 4, BC_SPREAD)
+            bullets.spawn(x, y + 2, v2.x, v2.y, True, 4, BC_SPREAD)
         sound.play("shoot")
     def take_damage(self, dmg: int, sound: SoundManager):
         if not FEATURES["HEALTH"]:
             self.hp = 0
             return
-        if self.iframes > 0: return
+        if self.iframes_until > self.sched.now: return
         if self.shield > 0:
             self.shield = max(0, self.shield - dmg)
             self.iframes = PLAYER_IFRAMES * 0.55
@@ -262,73 +973,197 @@ class Player:
         self.hp -= dmg
         self.iframes = PLAYER_IFRAMES
         sound.play("hit")
-    def draw(self, surf, offset=(0, 0)):
-        if self.iframes > 0 and (pygame.time.get_ticks() // 120) % 2 == 0: return
-        x, y = int(self.pos.x + offset[0]), int(self.pos.y + offset[1])
+    def blinking(self, ticks): return self.iframes_until > self.sched.now and (ticks // 120) % 2 == 0
+    @staticmethod
+    def draw_ship(surf, x, y):
         pygame.draw.polygon(surf, (235, 235, 245), [(x + 18, y), (x - 18, y - 10), (x - 18, y + 10)])
         pygame.draw.circle(surf, (60, 80, 120), (x - 6, y), 5)
+    @staticmethod
+    def draw_shield(surf, x, y):
+        pygame.draw.circle(surf, (110, 190, 255), (x, y), PLAYER_RADIUS + 8, width=3)
+    def draw(self, surf, offset=(0, 0), ticks=0):
+        if self.blinking(ticks): return
+        x, y = int(self.pos.x + offset[0]), int(self.pos.y + offset[1])
+        self.draw_ship(surf, x, y)
         if self.shield > 0:
-            pygame.draw.circle(surf, (110, 190, 255), (x, y), self.radius + 8, width=3)
+            self.draw_shield(surf, x, y)
+
+class EnemyBatch:
+    # structure-of-arrays movement state for every live enemy of one type, updated in one
+    # vectorized step per frame; members keep their slot and get their pos written back by sync().
+    # fire_at is the Scheduler time of a shooter's next shot; by_seq finds a member from its seq
+    FIELDS = ("x", "y", "speed", "fire_at", "seq")
+    def __init__(self, capacity=64):
+        self.n = 0
+        self.objs = []
+        self.x = np.zeros(capacity); self.y = np.zeros(capacity)
+        self.speed = np.zeros(capacity); self.fire_at = np.zeros(capacity)
+        self.seq = np.zeros(capacity, np.int64)
+        self.next_seq = 0
+        self.by_seq = {}
+    def __len__(self): return self.n
+    def add(self, e):
+        if self.n == len(self.x):
+            for name in self.FIELDS:
+                a = getattr(self, name)
+                setattr(self, name, np.concatenate([a, np.zeros_like(a)]))
+        i = self.n
+        self.x[i], self.y[i] = e.pos.x, e.pos.y
+        self.speed[i] = e.speed
+        self.fire_at[i] = 0.0
+        self.seq[i] = self.next_seq
+        self.by_seq[self.next_seq] = e
+        self.next_seq += 1
+        e.batch, e.slot = self, i
+        self.objs.append(e)
+        self.n += 1
+    def remove(self, e):
+        # swap the last member into the hole; firing order uses seq, not slot order
+        i, last = e.slot, self.n - 1
+        del self.by_seq[int(self.seq[i])]
+        if i != last:
+            for name in self.FIELDS:
+                a = getattr(self, name)
+                a[i] = a[last]
+            moved = self.objs[last]
+            self.objs[i] = moved
+            moved.slot = i
+        self.objs.pop()
+        self.n = last
+        e.batch = None
+    def reseq(self, e, seq):
+        del self.by_seq[int(self.seq[e.slot])]
+        self.seq[e.slot] = seq
+        self.by_seq[seq] = e
+    def sync(self):
+        n = self.n
+        for e, x, y in zip(self.objs, self.x[:n].tolist(), self.y[:n].tolist()):
+            e.pos.update(x, y)
 
 class EnemyBase:
+    __slots__ = ("pos", "prev", "hp", "radius", "dead_flag", "batch", "slot")
     def __init__(self, pos, hp=ENEMY_HP, radius=16):
         self.pos = pygame.Vector2(pos)
+        self.prev = pygame.Vector2(pos)
+        self.hp = hp
+        self.radius = radius
+        self.dead_flag = False
+        self.batch = None
+        self.slot = -1
+    def reset(self, pos, hp=ENEMY_HP, radius=16):
+        # re-initialise a pooled instance in place (see Pool)
+        self.pos.update(pos)
+        self.prev.update(pos)
         self.hp = hp
         self.radius = radius
         self.dead_flag = False
+        self.batch = None
+        self.slot = -1
+    def cooldown(self):
+        # firing timer as saved and hashed: the next shot's Scheduler time for batch members
+        if self.batch is not None: return float(self.batch.fire_at[self.slot])
+        return getattr(self, "fire_cd", 0.0)
     @property
     def dead(self): return self.dead_flag or self.hp <= 0 or self.pos.x < -120
     def hit(self, dmg, sound: SoundManager):
         self.hp -= dmg
         if self.hp <= 0: sound.play("boom")
     def update(self, dt, game): pass
+    sprite = "enemy"
+    @staticmethod
+    def draw_at(surf, x, y, r=16):
+        pygame.draw.circle(surf, (255, 120, 120), (x, y), r)
+        pygame.draw.circle(surf, (60, 30, 30), (x, y), r, width=2)
     def draw(self, surf, offset=(0, 0)):
-        x, y = int(self.pos.x + offset[0]), int(self.pos.y + offset[1])
-        pygame.draw.circle(surf, (255, 120, 120), (x, y), self.radius)
-        pygame.draw.circle(surf, (60, 30, 30), (x, y), self.radius, width=2)
+        self.draw_at(surf, int(self.pos.x + offset[0]), int(self.pos.y + offset[1]), self.radius)
 
 class EnemyChaser(EnemyBase):
+    __slots__ = ("speed",)
     def __init__(self, pos, speed, hp=ENEMY_HP):
         super().__init__(pos, hp=hp, radius=16)
         self.speed = speed
-    def update(self, dt, game):
-        target_y = game.player.pos.y
-        dy = clamp(target_y - self.pos.y, -1, 1)
-        self.pos.x -= self.speed * dt
-        self.pos.y += dy * (self.speed * 0.65) * dt
-        self.pos.y = clamp(self.pos.y, 30, HEIGHT - 30)
-    def draw(self, surf, offset=(0, 0)):
-        x, y = int(self.pos.x + offset[0]), int(self.pos.y + offset[1])
-        pygame.draw.circle(surf, (255, 150, 90), (x, y), self.radius)
+    def reset(self, pos, speed, hp=ENEMY_HP):
+        super().reset(pos, hp=hp, radius=16)
+        self.speed = speed
+    @staticmethod
+    def update_batch(b, dt, game):
+        n = b.n
+        if not n: return
+        x, y, speed = b.x[:n], b.y[:n], b.speed[:n]
+        dy = np.clip(game.player.pos.y - y, -1, 1)
+        x -= speed * dt
+        y += dy * (speed * 0.65) * dt
+        np.clip(y, 30, HEIGHT - 30, out=y)
+        b.sync()
+    sprite = "chaser"
+    @staticmethod
+    def draw_at(surf, x, y, r=16):
+        pygame.draw.circle(surf, (255, 150, 90), (x, y), r)
         pygame.draw.circle(surf, (35, 35, 40), (x + 4, y), 4)
 
 class EnemyShooter(EnemyBase):
-    def __init__(self, pos, speed, hp=ENEMY_HP):
+    # fire_cd is the delay to the first shot; Game.add_enemy turns it into a Scheduler SHOT event and
+    # EnemyBatch.fire_at, which are authoritative from then on (see cooldown()). A given fire_cd
+    # (restoring a saved shooter) is used as is, with no RNG draw.
+    __slots__ = ("speed", "fire_cd")
+    def __init__(self, pos, speed, hp=ENEMY_HP, rng=random, fire_cd=None):
         super().__init__(pos, hp=hp, radius=17)
         self.speed = speed
-        self.fire_cd = random.uniform(0.4, ENEMY_FIRE_COOLDOWN)
-    def update(self, dt, game):
-        self.pos.x -= self.speed * dt
-        self.pos.y += math.sin(pygame.time.get_ticks() * 0.004 + self.pos.x * 0.01) * 18 * dt
-        self.pos.y = clamp(self.pos.y, 30, HEIGHT - 30)
-        self.fire_cd -= dt
-        if self.fire_cd <= 0 and self.pos.x < WIDTH * 0.92:
-            self.fire_cd = ENEMY_FIRE_COOLDOWN * random.uniform(0.8, 1.2)
-            dv = (game.player.pos - self.pos)
-            if dv.length_squared() > 0: dv = dv.normalize()
-            game.bullets.append(Bullet(self.pos, dv * ENEMY_BULLET_SPEED, False, 4, (255, 210, 120)))
-    def draw(self, surf, offset=(0, 0)):
-        x, y = int(self.pos.x + offset[0]), int(self.pos.y + offset[1])
+        self.fire_cd = rng.uniform(0.4, ENEMY_FIRE_COOLDOWN) if fire_cd is None else fire_cd
+    def reset(self, pos, speed, hp=ENEMY_HP, rng=random, fire_cd=None):
+        super().reset(pos, hp=hp, radius=17)
+        self.speed = speed
+        self.fire_cd = rng.uniform(0.4, ENEMY_FIRE_COOLDOWN) if fire_cd is None else fire_cd
+    @staticmethod
+    def update_batch(b, dt, game):
+        n = b.n
+        if not n: return
+        x, y, speed = b.x[:n], b.y[:n], b.speed[:n]
+        x -= speed * dt
+        y += np.sin(game.clock.get_ticks() * 0.004 + x * 0.01) * 18 * dt
+        np.clip(y, 30, HEIGHT - 30, out=y)
+        if game.due_shots:
+            # members whose SHOT event came due this step (Game.run_timers); one still off the right
+            # edge is re-armed for the moment it crosses in
+            due = np.array(game.due_shots)
+            game.due_shots.clear()
+            due = due[np.argsort(b.seq[due])]  # spawn order keeps the rng sequence stable
+            edge = WIDTH * 0.92
+            fire = due[x[due] < edge]
+            for i in due[x[due] >= edge].tolist():
+                if speed[i] > 0: game.arm_shot(b, i, (x[i] - edge) / speed[i])
+            if fire.size:
+                rng = game.rng
+                for i in fire.tolist(): game.arm_shot(b, i, ENEMY_FIRE_COOLDOWN * rng.uniform(0.8, 1.2))
+                fx, fy = x[fire], y[fire]
+                dx, dy = game.player.pos.x - fx, game.player.pos.y - fy
+                d = np.sqrt(dx * dx + dy * dy)
+                nz = d > 0
+                dx[nz] /= d[nz]; dy[nz] /= d[nz]
+                game.bullets.spawn_many(fx, fy, dx * ENEMY_BULLET_SPEED, dy * ENEMY_BULLET_SPEED, False, 4, BC_SHOOTER)
+        b.sync()
+    sprite = "shooter"
+    @staticmethod
+    def draw_at(surf, x, y, r=17):
         pygame.draw.rect(surf, (255, 110, 170), (x - 18, y - 12, 36, 24), border_radius=10)
         pygame.draw.circle(surf, (25, 25, 30), (x + 8, y), 4)
 
 class Boss(EnemyBase):
-    def __init__(self, pos, hp):
+    __slots__ = ("speed", "phase", "entering", "pattern", "stage", "stage_time", "cds", "volleys")
+    def __init__(self, pos, hp, pattern="classic"):
         super().__init__(pos, hp=hp, radius=48)
         self.speed = BOSS_SPEED
-        self.fire_cd = 0.9
         self.phase = 0.0
         self.entering = True
+        self.pattern = boss_pattern(pattern)
+        self.start_stage(0)
+    def start_stage(self, i):
+        self.stage = i
+        self.stage_time = 0.0
+        emitters = self.pattern.stages[i][1]
+        self.cds = [em.delay for em in emitters]
+        self.volleys = [0] * len(emitters)
+    def cooldown(self): return self.cds[0]
     def update(self, dt, game):
         self.phase += dt
         if self.entering:
@@ -337,93 +1172,758 @@ class Boss(EnemyBase):
                 self.entering = False
         else:
             self.pos.y = HEIGHT * 0.5 + math.sin(self.phase * 1.4) * 110
-        self.fire_cd -= dt
-        if self.fire_cd <= 0:
-            self.fire_cd = BOSS_FIRE_COOLDOWN
-            for a in (-26, -13, 0, 13, 26):
-                v = pygame.Vector2(-1, 0).rotate(a) * (ENEMY_BULLET_SPEED * 1.10)
-                game.bullets.append(Bullet(self.pos + (-35, 0), v, False, 5, (255, 140, 140)))
-            if int(self.phase) % 2 == 0:
-                dv = (game.player.pos - self.pos)
-                if dv.length_squared() > 0: dv = dv.normalize()
-                game.bullets.append(Bullet(self.pos + (-35, 0), dv * (ENEMY_BULLET_SPEED * 1.25), False, 5, (255, 200, 90)))
-    def draw(self, surf, offset=(0, 0)):
-        x, y = int(self.pos.x + offset[0]), int(self.pos.y + offset[1])
-        pygame.draw.circle(surf, (160, 120, 255), (x, y), self.radius)
+        duration, emitters = self.pattern.stages[self.stage]
+        if duration is not None:
+            self.stage_time += dt
+            if self.stage_time >= duration:
+                self.start_stage((self.stage + 1) % len(self.pattern.stages))
+                emitters = self.pattern.stages[self.stage][1]
+        x, y = self.pos.x - 35, self.pos.y
+        aim = None
+        for i, em in enumerate(emitters):
+            self.cds[i] -= dt
+            if self.cds[i] > 0: continue
+            self.cds[i] = em.every
+            if em.gate and self.phase % (2 * em.gate) >= em.gate: continue
+            if em.kind == "aimed" and aim is None:
+                dx, dy = game.player.pos.x - self.pos.x, game.player.pos.y - self.pos.y
+                if dx or dy:
+                    n = math.sqrt(dx * dx + dy * dy)
+                    dx, dy = dx / n, dy / n
+                aim = (dx, dy)
+            em.fire(game.bullets, x, y, aim, self.volleys[i])
+            self.volleys[i] += 1
+    sprite = "boss"
+    @staticmethod
+    def draw_at(surf, x, y, r=48):
+        pygame.draw.circle(surf, (160, 120, 255), (x, y), r)
         pygame.draw.circle(surf, (30, 30, 40), (x - 10, y - 10), 7)
         pygame.draw.circle(surf, (30, 30, 40), (x - 10, y + 10), 7)
         pygame.draw.rect(surf, (30, 30, 40), (x - 64, y - 18, 30, 36), border_radius=10)
+    def draw(self, surf, offset=(0, 0)):
+        x, y = int(self.pos.x + offset[0]), int(self.pos.y + offset[1])
+        self.draw_at(surf, x, y, self.radius)
+        self.draw_bar(surf, x, y)
+    def draw_bar(self, surf, x, y):
+        self.hp_bar(surf, x, y, self.radius, clamp(self.hp / BOSS_HP, 0, 1))
+    @staticmethod
+    def hp_bar(surf, x, y, radius, frac):
         bar_w, bar_h = 200, 10
-        px, py = x - bar_w // 2, y - self.radius - 20
+        px, py = x - bar_w // 2, y - radius - 20
         pygame.draw.rect(surf, (40, 40, 55), (px, py, bar_w, bar_h), border_radius=6)
-        frac = clamp(self.hp / BOSS_HP, 0, 1)
         pygame.draw.rect(surf, (220, 220, 245), (px, py, int(bar_w * frac), bar_h), border_radius=6)
 
 class PowerUp:
     TYPES = ("rapid", "spread", "shield", "heal")
+    COLORS = {"rapid": (120, 255, 190), "spread": (160, 255, 160), "shield": (110, 190, 255), "heal": (255, 140, 180)}
+    __slots__ = ("pos", "prev", "ptype", "sprite", "radius", "vel", "taken")
     def __init__(self, pos, ptype: str):
         self.pos = pygame.Vector2(pos)
-        self.ptype = ptype
-        self.radius = 14
+        self.prev = pygame.Vector2(pos)
         self.vel = pygame.Vector2(-180, 0)
-    def update(self, dt): self.pos += self.vel * dt
+        self.reset(pos, ptype)
+    def reset(self, pos, ptype: str):
+        self.pos.update(pos)
+        self.prev.update(pos)
+        self.ptype = self.sprite = ptype
+        self.radius = 14
+        self.taken = False
+    def update(self, dt):
+        self.pos.x += self.vel.x * dt
+        self.pos.y += self.vel.y * dt
     @property
-    def dead(self): return self.pos.x < -80
+    def dead(self): return self.taken or self.pos.x < -80
+    @staticmethod
+    def draw_at(surf, x, y, ptype, r=14):
+        pygame.draw.circle(surf, PowerUp.COLORS[ptype], (x, y), r)
+        pygame.draw.circle(surf, (25, 25, 30), (x, y), r, width=2)
     def draw(self, surf, offset=(0, 0)):
-        colors = {"rapid": (120, 255, 190), "spread": (160, 255, 160), "shield": (110, 190, 255), "heal": (255, 140, 180)}
-        c = colors[self.ptype]
-        pygame.draw.circle(surf, c, (int(self.pos.x + offset[0]), int(self.pos.y + offset[1])), self.radius)
-        pygame.draw.circle(surf, (25, 25, 30), (int(self.pos.x + offset[0]), int(self.pos.y + offset[1])), self.radius, width=2)
+        self.draw_at(surf, int(self.pos.x + offset[0]), int(self.pos.y + offset[1]), self.ptype, self.radius)
+
+class Pool:
+    # free list of reusable entities: acquire() re-initialises a released object through reset(),
+    # or builds a new one; the counters show how many objects were actually allocated
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.created = self.reused = self.released = 0
+    def acquire(self, *args, **kw):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kw)
+            self.reused += 1
+            return obj
+        self.created += 1
+        return self.cls(*args, **kw)
+    def release(self, obj):
+        self.free.append(obj)
+        self.released += 1
+    def stats(self):
+        return {"created": self.created, "reused": self.reused, "released": self.released, "free": len(self.free)}
+
+class Profiler:
+    # per-phase frame timings: begin() starts a frame, lap(name) charges the time since the previous
+    # mark to `name` (summed over every fixed step in the frame), end_frame() pushes the totals into
+    # a rolling window. When disabled every hook is a bare attribute check + return.
+    WINDOW = 120
+    REFRESH = 15  # frames between overlay re-renders
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.t = 0.0
+        self.cur = {}
+        self.rings = {}
+        self.frame = 0
+        self.panel = None
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.cur.clear(); self.rings.clear(); self.panel = None
+    def begin(self):
+        if self.enabled: self.t = time.perf_counter()
+    def lap(self, name):
+        if not self.enabled: return
+        now = time.perf_counter()
+        self.cur[name] = self.cur.get(name, 0.0) + now - self.t
+        self.t = now
+    def charge(self, name, seconds):
+        # time measured elsewhere (e.g. GC pauses inside other phases) shown as its own row
+        if self.enabled: self.cur[name] = self.cur.get(name, 0.0) + seconds
+    def end_frame(self):
+        if not self.enabled: return
+        slot = self.frame % self.WINDOW
+        for name, ring in self.rings.items():
+            ring[slot] = self.cur.pop(name, 0.0)
+        for name, v in self.cur.items():
+            ring = self.rings[name] = np.zeros(self.WINDOW)
+            ring[slot] = v
+        self.cur.clear()
+        self.frame += 1
+    def stats(self):
+        n = min(self.frame, self.WINDOW) or 1
+        return {name: (float(r[:n].mean()) * 1000.0, float(r[:n].max()) * 1000.0) for name, r in self.rings.items()}
+    def draw(self, surf, font, counts):
+        if not self.enabled: return
+        if self.panel is None or self.frame % self.REFRESH == 0:
+            color, lh = (200, 255, 200), font.get_linesize()
+            rows = [("phase", "avg ms", "max ms")]
+            rows += [(name, f"{avg:.2f}", f"{worst:.2f}") for name, (avg, worst) in self.stats().items()]
+            foot = font.render("  ".join(f"{k}={v}" for k, v in counts.items()), True, color)
+            w = max(250, foot.get_width() + 12)
+            self.panel = pygame.Surface((w, lh * (len(rows) + 1) + 8), pygame.SRCALPHA)
+            self.panel.fill((0, 0, 0, 170))
+            for i, (name, avg, worst) in enumerate(rows):
+                y = 4 + i * lh
+                self.panel.blit(font.render(name, True, color), (6, y))
+                for text, right in ((avg, 170), (worst, 240)):
+                    t = font.render(text, True, color)
+                    self.panel.blit(t, (right - t.get_width(), y))
+            self.panel.blit(foot, (6, 4 + len(rows) * lh))
+        surf.blit(self.panel, (WIDTH - self.panel.get_width() - 8, 56))
+
+class QualityGovernor:
+    # watches per-frame work time (excluding the frame-cap sleep) and steps one quality setting
+    # at a time: down a level when the p90 of the last window is over budget, back up after
+    # several calm windows in a row. Returns the change as a command for Game.command.
+    WINDOW = 30
+    DEGRADE_ORDER = ("kill_particles", "hit_particles", "banner_panels", "star_layers")
+    RESTORE_AFTER = 4
+    CALM = 0.6  # fraction of the budget that counts as headroom
+    def __init__(self, fps=FPS, log=print):
+        self.budget = 1.0 / fps
+        self.times = []
+        self.calm = 0
+        self.log = log
+        self.changes = []
+    def observe(self, frame_time, quality):
+        self.times.append(frame_time)
+        if len(self.times) < self.WINDOW: return None
+        p90 = sorted(self.times)[int(len(self.times) * 0.9)]
+        self.times.clear()
+        if p90 > self.budget:
+            self.calm = 0
+            for name in self.DEGRADE_ORDER:
+                levels = QUALITY_LEVELS[name]
+                i = levels.index(quality[name])
+                if i > 0: return self._change(name, quality[name], levels[i - 1], p90)
+            return None
+        self.calm = self.calm + 1 if p90 < self.budget * self.CALM else 0
+        if self.calm >= self.RESTORE_AFTER:
+            self.calm = 0
+            for name in reversed(self.DEGRADE_ORDER):
+                levels = QUALITY_LEVELS[name]
+                i = levels.index(quality[name])
+                if i < len(levels) - 1: return self._change(name, quality[name], levels[i + 1], p90)
+        return None
+    def _change(self, name, old, new, p90):
+        self.changes.append((time.perf_counter(), name, old, new, p90))
+        self.log(f"quality: {name} {old} -> {new} (p90 frame {p90 * 1000:.1f} ms, budget {self.budget * 1000:.1f} ms)")
+        return EV_QUALITY + QUALITY_NAMES.index(name) * 32 + new
+
+class FramePacer:
+    # "classic": clock.tick(fps) then sample input. "low-latency": sleep until the frame deadline minus
+    # the predicted work (p90 of recent frames + margin), optionally busy-waiting the last `spin`
+    # seconds for a precise wake, then sample input so the frame is presented just in time. With
+    # vsync, a flip() that blocked marks the vblank, so the next deadline is re-anchored on it.
+    # Records sample -> present latency and present-to-present intervals either way.
+    HISTORY = 36000
+    def __init__(self, fps=FPS, mode="classic", spin=0.0, vsync=False, margin=0.002):
+        self.fps, self.period = fps, 1.0 / fps
+        self.mode, self.spin, self.vsync, self.margin = mode, spin, vsync, margin
+        self.clock = pygame.time.Clock()
+        self.last = time.perf_counter()
+        self.deadline = None
+        self.work = deque(maxlen=30)
+        self.latency = deque(maxlen=self.HISTORY)
+        self.intervals = deque(maxlen=self.HISTORY)
+        self.t_in = self.t_present = None
+    def wait(self):
+        # returns seconds since the previous wait, like Clock.tick
+        if self.mode == "classic":
+            self.clock.tick(self.fps)
+        else:
+            if self.deadline is None: self.deadline = time.perf_counter() + self.period
+            predicted = sorted(self.work)[int(len(self.work) * 0.9)] if self.work else self.period / 2
+            self._sleep_until(self.deadline - predicted - self.margin)
+        now = time.perf_counter()
+        dt, self.last, self.t_in = now - self.last, now, now
+        return dt
+    def _sleep_until(self, t):
+        remaining = t - time.perf_counter()
+        if remaining - self.spin > 0: time.sleep(remaining - self.spin)
+        if self.spin > 0:
+            while time.perf_counter() < t: pass
+    def present(self):
+        t0 = time.perf_counter()
+        pygame.display.flip()
+        now = time.perf_counter()
+        self.work.append(now - self.t_in)
+        self.latency.append(now - self.t_in)
+        if self.t_present is not None: self.intervals.append(now - self.t_present)
+        self.t_present = now
+        if self.mode != "classic":
+            self.deadline += self.period
+            blocked = now - t0 > 0.001
+            if (self.vsync and blocked) or self.deadline < now: self.deadline = now + self.period
+    def last_work(self): return self.work[-1] if self.work else 0.0
+    def report(self):
+        if not self.intervals: return "pacing: no frames"
+        lat = np.asarray(self.latency) * 1000.0
+        iv = np.asarray(self.intervals) * 1000.0
+        p = lambda a, q: float(np.percentile(a, q))
+        missed = int((iv > self.period * 1500.0).sum())
+        return (f"pacing: mode={self.mode} vsync={'on' if self.vsync else 'off'} spin={self.spin * 1000:.1f} ms, {len(iv) + 1} frames\n"
+                f"  input->present ms: mean {lat.mean():.2f}  p50 {p(lat, 50):.2f}  p95 {p(lat, 95):.2f}  p99 {p(lat, 99):.2f}  max {lat.max():.2f}\n"
+                f"  frame interval ms: mean {iv.mean():.2f}  p50 {p(iv, 50):.2f}  p95 {p(iv, 95):.2f}  p99 {p(iv, 99):.2f}  "
+                f"std {iv.std():.3f}  jitter p99-p50 {p(iv, 99) - p(iv, 50):.3f}  missed {missed}")
+
+class GcControl:
+    # keeps cyclic-GC pauses out of play. start() collects once and gc.freeze()s everything loaded at
+    # startup, so later collections never walk it again. mode="managed": automatic collection is off
+    # while PLAYING, with a gen-0 backstop past GC_PLAY_LIMIT (play makes few cycles); safe frames (wave
+    # banner, pause, menu, game over) turn it back on and collect one generation per frame, young to
+    # old, once per safe stretch. With no safe point for GC_SWEEP_FRAMES (WAVES off, a long boss) the
+    # same sweep runs during play. mode="python" leaves the stock collector alone and only measures.
+    # A gc.callbacks hook times every collection; frame() charges it to the frame it landed in.
+    GENS = ("gen0", "gen1", "gen2")
+    def __init__(self, mode="managed"):
+        self.mode = mode
+        self.frozen = 0
+        self.startup = 0.0
+        self.t0 = 0.0
+        self.pause = 0.0      # collection time since the last frame()
+        self.playing = False
+        self.sweep = 0        # next generation a safe frame collects; 3 = done until play resumes
+        self.since = 0        # play frames since the last sweep
+        self.counts = {"play": [0, 0, 0], "safe": [0, 0, 0]}
+        self.worst = {"play": 0.0, "safe": 0.0}
+        # (gc pause, frame work) per frame in play, in a preallocated ring so recording allocates nothing
+        self.play = np.zeros((FramePacer.HISTORY, 2))
+        self.nplay = 0
+    def _hook(self, phase, info):
+        if phase == "start":
+            self.t0 = time.perf_counter()
+            return
+        dt = time.perf_counter() - self.t0
+        self.pause += dt
+        where = "play" if self.playing else "safe"
+        self.counts[where][info["generation"]] += 1
+        self.worst[where] = max(self.worst[where], dt)
+    def start(self):
+        if self.mode == "managed":
+            t0 = time.perf_counter()
+            gc.collect()
+            gc.freeze()
+            self.startup = time.perf_counter() - t0
+            self.frozen = gc.get_freeze_count()
+        gc.callbacks.append(self._hook)
+    def stop(self):
+        gc.callbacks.remove(self._hook)
+        gc.enable()
+    def frame(self, game, work=0.0, prof=None):
+        # once per rendered frame: book the pauses it took, then pick the collector state for the next one
+        if prof is not None: prof.charge("gc", self.pause)
+        if self.playing:
+            row = self.play[self.nplay % len(self.play)]
+            row[0] = self.pause; row[1] = work
+            self.nplay += 1
+        self.pause = 0.0
+        self.playing = game.state == Game.PLAYING and game.banner_until <= game.time
+        if self.mode != "managed": return
+        if self.playing:
+            if gc.isenabled(): gc.disable()
+            self.since += 1
+            if self.since < GC_SWEEP_FRAMES: self.sweep = 0
+            elif self.sweep < 3:
+                gc.collect(self.sweep)
+                self.sweep += 1
+            else: self.since = self.sweep = 0
+            if gc.get_count()[0] > GC_PLAY_LIMIT: gc.collect(0)
+        else:
+            self.since = 0
+            gc.enable()
+            if self.sweep < 3:
+                gc.collect(self.sweep)
+                self.sweep += 1
+    def report(self):
+        frozen = f", {self.frozen} objects frozen at startup ({self.startup * 1000:.1f} ms)" if self.mode == "managed" else ""
+        lines = [f"gc: mode={self.mode}{frozen}"]
+        for where in ("play", "safe"):
+            n = "/".join(map(str, self.counts[where]))
+            lines.append(f"  {where:<5} collections {'/'.join(self.GENS)}: {n}, worst {self.worst[where] * 1000:.2f} ms")
+        if self.nplay:
+            a = self.play[:min(self.nplay, len(self.play))] * 1000.0
+            hit = a[:, 0] > 0
+            p99 = lambda v: float(np.percentile(v, 99)) if len(v) else 0.0
+            lines.append(f"  play frames {len(a)}, {int(hit.sum())} with a gc pause (max {a[:, 0].max():.2f} ms); "
+                         f"work p99 {p99(a[:, 1]):.2f} ms, {p99(a[~hit, 1]):.2f} ms without gc frames")
+        return "\n".join(lines)
+
+class FrameCapture:
+    # built-in gameplay capture. grab() copies the finished frame straight out of the Surface's pixel
+    # buffer into a preallocated slot (one memcpy, no per-frame allocation) and queues it; a writer
+    # thread converts and encodes. With every slot in flight a live grab() drops the frame rather
+    # than wait; block=True (offline replay export) waits instead, so no frame is lost.
+    # Output by path: "-" or *.y4m (Y4M 4:2:0, stdout / file), *.rgb / *.raw (packed RGB24),
+    # *.png (a %d pattern, else numbered out_000000.png ...) or a directory (PNG sequence).
+    def __init__(self, path, size, fps=FPS, slots=8, block=False):
+        self.path, self.size, self.fps, self.block = path, size, fps, block
+        self.slots = slots
+        self.free, self.full = queue.Queue(), queue.Queue()
+        self.bufs = None
+        self.grabbed = self.dropped = self.written = self.bytes = 0
+        self.grab_t = deque(maxlen=600)
+        self.encode_t = deque(maxlen=600)
+        self.error = None
+        self.tmp = {}
+        w, h = size
+        ext = os.path.splitext(path)[1].lower()
+        self.out = None
+        if path == "-" or ext == ".y4m":
+            if w % 2 or h % 2: raise ValueError("Y4M 4:2:0 capture needs an even frame size")
+            self.encode = self._y4m
+            self.out = sys.__stdout__.buffer if path == "-" else open(path, "wb")
+            self.out.write(f"YUV4MPEG2 W{w} H{h} F{fps}:1 Ip A1:1 C420jpeg\n".encode())
+        elif ext in (".rgb", ".raw"):
+            self.encode = self._raw
+            self.out = open(path, "wb")
+        elif ext == ".png" or not ext:
+            self.encode = self._png
+            if not ext:
+                if "%" in path: raise ValueError(f"{path}: a PNG frame pattern needs a .png extension")
+                self.path = os.path.join(path, "frame_%06d.png")          # a directory
+            elif "%" not in path:
+                self.path = os.path.splitext(path)[0] + "_%06d" + path[-4:]   # out.png -> out_000000.png, ...
+            try: self.path % 0
+            except (TypeError, ValueError): raise ValueError(f"{path}: PNG pattern needs exactly one %d field") from None
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        else:
+            raise ValueError(f"{path}: capture to .y4m, .rgb/.raw, .png (%d pattern) or a directory")
+        self.thread = threading.Thread(target=self.run, name="capture", daemon=True)
+        self.thread.start()
+    def _setup(self, surf):
+        # channel byte offsets come from the surface masks (little-endian pixels)
+        self.bpp = surf.get_bytesize()
+        if self.bpp not in (3, 4): raise ValueError("capture needs a 24- or 32-bit surface")
+        self.rgb = [(m.bit_length() - 1) // 8 for m in surf.get_masks()[:3]]
+        shape = (surf.get_height(), surf.get_pitch())
+        self.bufs = [np.empty(shape, np.uint8) for _ in range(self.slots)]
+        for b in self.bufs: self.free.put(b)
+    def grab(self, surf):
+        if self.bufs is None: self._setup(surf)
+        try:
+            buf = self.free.get() if self.block else self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        t0 = time.perf_counter()
+        view = surf.get_view("1")
+        np.copyto(buf, np.frombuffer(view, np.uint8).reshape(buf.shape))
+        del view  # the view keeps the surface locked
+        self.grab_t.append(time.perf_counter() - t0)
+        self.full.put((self.grabbed, buf))
+        self.grabbed += 1
+        return True
+    def run(self):
+        w, h = self.size
+        while True:
+            item = self.full.get()
+            if item is None: return
+            i, buf = item
+            t0 = time.perf_counter()
+            try:
+                if self.error is None:
+                    # encoders read per-channel strided views of the slot and write into reused scratch arrays
+                    px = buf[:, :w * self.bpp].reshape(h, w, self.bpp)
+                    self.encode(i, px, [px[..., k] for k in self.rgb])
+                    self.written += 1
+            except Exception as e:
+                self.error = e
+            self.free.put(buf)
+            self.encode_t.append(time.perf_counter() - t0)
+    def _scratch(self, key, shape, dtype):
+        a = self.tmp.get(key)
+        if a is None: a = self.tmp[key] = np.empty(shape, dtype)
+        return a
+    def _write(self, data):
+        self.out.write(data)
+        self.bytes += data.nbytes
+    def _raw(self, i, px, chans):
+        self._write(self._rgb24(chans))
+    def _y4m(self, i, px, chans):
+        # BT.601 studio range in uint16/int32 scratch planes; chroma from the 2x2 RGB sums,
+        # added row pairs first (contiguous) then column pairs
+        w, h = self.size
+        r, g, b = chans
+        y, t = self._scratch("y", (h, w), np.uint16), self._scratch("t", (h, w), np.uint16)
+        np.multiply(r, 66, out=y, dtype=np.uint16)
+        np.multiply(g, 129, out=t, dtype=np.uint16); np.add(y, t, out=y)
+        np.multiply(b, 25, out=t, dtype=np.uint16); np.add(y, t, out=y)
+        np.add(y, 128 + (16 << 8), out=y); np.right_shift(y, 8, out=y)
+        frame = self._scratch("frame", (h * w * 3 // 2,), np.uint8)
+        frame[:h * w].reshape(h, w)[:] = y
+        rows = self._scratch("rows", (h // 2, w, self.bpp), np.uint16)
+        np.add(px[0::2], px[1::2], out=rows, dtype=np.uint16)
+        q = self._scratch("q", (h // 2, w // 2, self.bpp), np.uint16)
+        np.add(rows[:, 0::2], rows[:, 1::2], out=q)
+        c, s = self._scratch("c", (h // 2, w // 2), np.int32), self._scratch("s", (h // 2, w // 2), np.int32)
+        r, g, b = (q[..., k] for k in self.rgb)
+        n = h * w // 4
+        for o, (kr, kg, kb) in zip((h * w, h * w + n), ((-38, -74, 112), (112, -94, -18))):
+            np.multiply(r, kr, out=c, dtype=np.int32)
+            np.multiply(g, kg, out=s, dtype=np.int32); np.add(c, s, out=c)
+            np.multiply(b, kb, out=s, dtype=np.int32); np.add(c, s, out=c)
+            np.add(c, 512 + (128 << 10), out=c); np.right_shift(c, 10, out=c)
+            frame[o:o + n].reshape(h // 2, w // 2)[:] = c
+        self._write(memoryview(b"FRAME\n"))
+        self._write(frame)
+    def _png(self, i, px, chans):
+        name = self.path % i
+        pygame.image.save(pygame.image.frombuffer(self._rgb24(chans), self.size, "RGB"), name)
+        self.bytes += os.path.getsize(name)
+    def _rgb24(self, chans):
+        w, h = self.size
+        out = self._scratch("rgb", (h, w, 3), np.uint8)
+        for k, c in enumerate(chans): out[..., k] = c
+        return out
+    def close(self):
+        self.full.put(None)
+        self.thread.join()
+        if self.out is not None:
+            self.out.flush()
+            if self.out is not sys.__stdout__.buffer: self.out.close()
+        if self.error is not None: raise self.error
+    def report(self):
+        g = np.mean(self.grab_t) * 1e6 if self.grab_t else 0.0
+        e = np.mean(self.encode_t) * 1e3 if self.encode_t else 0.0
+        return (f"capture: {self.grabbed} frames grabbed, {self.dropped} dropped, {self.written} written "
+                f"({self.bytes / 1048576:.1f} MiB) to {self.path}; grab {g:.0f} us, encode {e:.1f} ms per frame")
+
+class SpriteAtlas:
+    # every entity look baked once into a display-format, per-pixel-alpha surface (RLE-accelerated)
+    # from the same draw_at() primitives; sprites[key] = (surface, anchor_x, anchor_y)
+    def __init__(self):
+        self.sprites = {}
+        self.bake("player", 20, 12, Player.draw_ship)
+        self.bake("player_shield", 28, 28, Player.draw_shield)
+        self.bake("enemy", 18, 18, EnemyBase.draw_at)
+        self.bake("chaser", 18, 18, EnemyChaser.draw_at)
+        self.bake("shooter", 20, 14, EnemyShooter.draw_at)
+        self.bake("boss", 66, 50, Boss.draw_at)
+        for t in PowerUp.TYPES:
+            self.bake(t, 16, 16, lambda s, x, y, t=t: PowerUp.draw_at(s, x, y, t))
+        # bullets[color * 8 + radius] -> surface anchored at (radius + 2, radius + 2)
+        self.bullets = [None] * (len(BULLET_COLORS) * 8)
+        for c, col in enumerate(BULLET_COLORS):
+            for r in range(1, BULLET_MAX_RADIUS + 1):
+                self.bullets[c * 8 + r] = self.bake(("bullet", c, r), r + 2, r + 2, lambda s, x, y, col=col, r=r: pygame.draw.circle(s, col, (x, y), r))[0]
+    def bake(self, key, ax, ay, draw_at):
+        surf = pygame.Surface((2 * ax + 1, 2 * ay + 1), pygame.SRCALPHA)
+        draw_at(surf, ax, ay)
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha()
+        surf.set_alpha(255, pygame.RLEACCEL)
+        self.sprites[key] = entry = (surf, ax, ay)
+        return entry
+
+class TextCache:
+    # bounded LRU of rendered text, translucent panels and HUD bars, so steady-state frames
+    # neither rasterise glyphs nor allocate surfaces
+    def __init__(self, size=256):
+        self.size = size
+        self.items = OrderedDict()
+        self.hits = self.misses = 0
+    def get(self, key, make):
+        s = self.items.get(key)
+        if s is not None:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return s
+        self.misses += 1
+        s = self.items[key] = make()
+        if len(self.items) > self.size:
+            self.items.popitem(last=False)
+        return s
+    def text(self, font, text, color):
+        return self.get((id(font), text, color), lambda: font.render(text, True, color))
+    def panel(self, w, h, rgba):
+        def make():
+            p = pygame.Surface((w, h), pygame.SRCALPHA)
+            p.fill(rgba)
+            return p
+        return self.get(("panel", w, h, rgba), make)
+    def bar(self, w, h, fill_w, color, back=(40, 40, 60)):
+        def make():
+            b = pygame.Surface((w, h), pygame.SRCALPHA)
+            pygame.draw.rect(b, back, (0, 0, w, h), border_radius=6)
+            pygame.draw.rect(b, color, (0, 0, fill_w, h), border_radius=6)
+            return b
+        return self.get(("bar", w, h, fill_w, color, back), make)
+
+class FlatArrays:
+    # named flat arrays with a live count n, regrown by doubling; one per Snapshot layer
+    def __init__(self, **fields):
+        self.n = 0
+        self.fields = fields
+        for name, dtype in fields.items(): setattr(self, name, np.zeros(64, dtype))
+    def reserve(self, n):
+        cap = len(self.x)
+        if n > cap:
+            cap = max(n, 2 * cap)
+            for name, dtype in self.fields.items(): setattr(self, name, np.zeros(cap, dtype))
+        self.n = n
+        return self
+    def take(self, src, idx):
+        # gather rows idx out of a structure-of-arrays store with the same field names
+        self.reserve(len(idx))
+        for name in self.fields: np.take(getattr(src, name), idx, out=getattr(self, name)[:self.n])
+    def copy(self, src, n):
+        self.reserve(n)
+        for name in self.fields: getattr(self, name)[:n] = getattr(src, name)[:n]
+    @property
+    def nbytes(self): return sum(getattr(self, name)[:self.n].nbytes for name in self.fields)
+
+class Snapshot:
+    # everything the renderer reads, as flat arrays and immutable values. Game.capture() refills one
+    # in place, so a handoff costs one copy per live entity and shares no objects with the simulation
+    KINDS = ("enemy", "chaser", "shooter", "boss") + PowerUp.TYPES
+    KIND_ID = {k: i for i, k in enumerate(KINDS)}
+    def __init__(self):
+        self.ents = FlatArrays(x=float, y=float, px=float, py=float, kind=np.int16)
+        self.bars = FlatArrays(x=float, y=float, px=float, py=float, frac=float, radius=np.int32)
+        self.bullets = FlatArrays(x=float, y=float, px=float, py=float, radius=np.int32, color=np.uint8)
+        self.particles = FlatArrays(x=float, y=float, px=float, py=float, life=float, max_life=float,
+                                    radius=np.int32, color=np.uint8)
+        self.player = (0.0, 0.0, 0.0, 0.0)  # x, y, prev x, prev y
+        self.player_visible = True
+        self.shield = False
+        self.stars = None
+        self.offset = (0, 0)
+        self.hud = self.overlay = None
+        self.counts = {}
+        self.time = 0.0
+    @property
+    def nbytes(self):
+        return self.ents.nbytes + self.bars.nbytes + self.bullets.nbytes + self.particles.nbytes
+
+class SnapshotExchange:
+    # triple buffer between the sim thread and the renderer: the sim fills `back` and publish() swaps
+    # it into the shared middle slot; latest() swaps that into `front` only if something new arrived.
+    # The lock guards two reference swaps, never a copy, so neither side waits on the other's work.
+    def __init__(self):
+        self.back, self.mid, self.front = Snapshot(), Snapshot(), Snapshot()
+        self.fresh = False
+        self.lock = threading.Lock()
+        self.published = self.skipped = 0
+    def publish(self):
+        with self.lock:
+            self.back, self.mid = self.mid, self.back
+            if self.fresh: self.skipped += 1  # replaced one the renderer never picked up
+            self.fresh = True
+        self.published += 1
+    def latest(self):
+        with self.lock:
+            if self.fresh:
+                self.front, self.mid = self.mid, self.front
+                self.fresh = False
+        return self.front
 
 class Game:
     MENU, PLAYING, PAUSED, GAMEOVER = "menu", "playing", "paused", "gameover"
-    def __init__(self, sound: SoundManager):
+    def __init__(self, sound: SoundManager, seed=None, clock=None, persist=True):
         self.sound = sound
+        self.rng = random.Random(seed)
+        self.fx_rng = random.Random(self.rng.getrandbits(64))
+        self.clock = clock or SimClock()
+        self.persist = persist
         self.state = self.MENU
         self.difficulty = "Normal"
-        self.player = Player()
+        self.sched = Scheduler()
+        self.timers = {}  # T_SINGLE kind -> its Scheduler entry
+        self.due_shots = []
+        self.player = Player(self.sched)
         self.enemies = []
         self.powerups = []
-        self.bullets = []
-        self.particles = []
-        self.stars = [Star() for _ in range(80)]
+        self.pools = {cls: Pool(cls) for cls in (EnemyChaser, EnemyShooter, PowerUp)}
+        self.batches = {EnemyChaser: EnemyBatch(), EnemyShooter: EnemyBatch()}
+        self.solo = []  # enemies updated one at a time (the boss)
+        self.bullets = BulletPool()
+        self.particles = ParticleSystem(seed=self.rng.getrandbits(64))
+        self.starfield = Starfield(self.fx_rng)
         self.score = 0
-        self.high = load_highscore()
+        self.high = 0
+        self.scores = ScoreStore(on_load=self.refresh_high) if persist else None
+        self.rank = 0
         self.time = 0.0
         self.wave = 1
-        self.wave_banner = WAVE_BANNER_TIME if FEATURES["WAVES"] else 0.0
-        self.boss_warning = 0.0
         self.boss_active = False
-        self.enemy_timer = ENEMY_SPAWN_BASE
-        self.power_timer = POWERUP_SPAWN_BASE
         self.combo_kills = 0
-        self.combo_timer = 0.0
+        self.start_timers()
         self.shake = 0.0
+        self.enemy_grid = SpatialGrid()
+        self.power_grid = SpatialGrid()
+        self.pair_tests = 0
+        self.atlas = None
+        self.use_sprites = True
+        self.quality = {name: levels[-1] for name, levels in QUALITY_LEVELS.items()}
+        self.prof = Profiler()
+        self.text_cache = TextCache()
+        self.hud_key = None
+        self.hud_seq = []
+
+    def best_score(self):
+        return self.scores.best(self.difficulty) if self.scores else self.high
+
+    def refresh_high(self, scores=None):
+        # the menu / HUD best for the selected difficulty; the store calls this from its thread once loaded
+        scores = scores or self.scores
+        if scores is not None and scores.loaded.is_set(): self.high = max(self.score, scores.best(self.difficulty))
 
     def reset_run(self):
-        self.player = Player()
-        self.enemies.clear(); self.powerups.clear(); self.bullets.clear(); self.particles.clear()
+        self.high = self.best_score()
+        self.rank = 0
+        for e in self.enemies: self.release(e)
+        for pu in self.powerups: self.release(pu)
+        self.enemies.clear(); self.solo.clear(); self.powerups.clear(); self.bullets.clear(); self.particles.clear()
         self.score = 0
         self.time = 0.0; self.wave = 1
-        self.wave_banner = WAVE_BANNER_TIME if FEATURES["WAVES"] else 0.0
-        self.boss_warning = 0.0; self.boss_active = False
-        self.enemy_timer = ENEMY_SPAWN_BASE
-        self.power_timer = POWERUP_SPAWN_BASE
-        self.combo_kills = 0; self.combo_timer = 0.0
+        self.boss_active = False
+        self.combo_kills = 0
+        self.start_timers()
+        self.player = Player(self.sched)
         self.shake = 0.0
         self.state = self.PLAYING
 
+    def start_timers(self):
+        # a fresh scheduler for a run from time 0: first spawns, wave 1 and its timeline
+        self.sched.clear()
+        self.timers.clear()
+        self.due_shots.clear()
+        self.banner_until = WAVE_BANNER_TIME if FEATURES["WAVES"] else 0.0
+        self.spawn_held = 0.0
+        self.arm(T_SPAWN, ENEMY_SPAWN_BASE)
+        if FEATURES["POWERUPS"]: self.arm(T_POWER, POWERUP_SPAWN_BASE)
+        self.start_wave(0.0)
+
+    def arm(self, kind, delay, a=0):
+        # (re)start a one-per-game timer
+        self.sched.cancel(self.timers.get(kind))
+        self.timers[kind] = self.sched.after(delay, kind, a)
+
+    def arm_shot(self, batch, i, delay):
+        due = batch.fire_at[i] = self.sched.now + delay
+        self.sched.at(due, T_SHOT, int(batch.seq[i]))
+
+    def start_wave(self, start):
+        # wave parameters are computed here once; the timeline's cues go on the heap up front
+        self.wp = WaveParams(self.wave, self.difficulty)
+        if not FEATURES["WAVES"]: return
+        self.timers[T_WAVE] = self.sched.at(self.wave * WAVE_DURATION, T_WAVE)
+        for i, item in enumerate(self.wp.timeline):
+            self.sched.at(start + item["at"], T_CUE, self.wave, i)
+
+    def run_timers(self):
+        self.due_shots.clear()
+        shooters = self.batches[EnemyShooter]
+        for due, kind, a, b in self.sched.due(self.time):
+            if kind == T_SHOT:
+                # stale if the shooter has gone (its seq is not reused) or was re-armed since
+                e = shooters.by_seq.get(a)
+                if e is not None and shooters.fire_at[e.slot] == due: self.due_shots.append(e.slot)
+            elif kind == T_SPAWN: self.spawn_enemy()
+            elif kind == T_POWER: self.spawn_powerup()
+            elif kind == T_WAVE: self.next_wave(due)
+            elif kind == T_CUE: self.cue(wave_plan(a)["timeline"][b])
+            elif kind == T_BOSS: self.spawn_boss_now(list(BOSS_PATTERNS)[a])
+            elif kind == T_COMBO: self.combo_kills = 0
+
+    def next_wave(self, due):
+        self.wave += 1
+        self.banner_until = self.time + WAVE_BANNER_TIME
+        self.sound.play("power")
+        self.start_wave(due)
+        rate = self.wp.spawn_rate
+        if self.boss_active: self.spawn_held = min(self.spawn_held, rate)
+        elif self.sched.left(self.timers.get(T_SPAWN)) > rate: self.arm(T_SPAWN, rate)
+
+    def cue(self, item):
+        if "boss" in item:
+            if FEATURES["BOSS"]: self.boss_warning_start(item["boss"])
+            return
+        wp, rng = self.wp, self.rng
+        n = item.get("count", 1)
+        y0 = y1 = item.get("y", HEIGHT * 0.5)
+        if isinstance(y0, list): y0, y1 = y0
+        gap = item.get("gap", 48)
+        for k in range(n):
+            x = WIDTH + 60 + k * gap
+            y = y0 + (y1 - y0) * k / (n - 1) if n > 1 else y0
+            if item["spawn"] == "shooter":
+                self.add_enemy(self.pools[EnemyShooter].acquire((x, y), wp.enemy_speed * 0.92, hp=wp.enemy_hp + 8, rng=rng))
+            else:
+                self.add_enemy(self.pools[EnemyChaser].acquire((x, y), wp.enemy_speed, hp=wp.enemy_hp))
+
+    def key_command(self, key):
+        # the command a key press issues in the current state, or None
+        if self.state == self.MENU:
+            return {pygame.K_1: EV_EASY, pygame.K_2: EV_NORMAL, pygame.K_3: EV_HARD, pygame.K_RETURN: EV_START}.get(key)
+        if self.state == self.PLAYING and key == pygame.K_p: return EV_PAUSE
+        if self.state == self.PAUSED and key == pygame.K_p: return EV_RESUME
+        if self.state == self.GAMEOVER and key == pygame.K_r: return EV_RESTART
+        return None
+
+    def command(self, ev):
+        if ev in EV_DIFFICULTY:
+            self.difficulty = EV_DIFFICULTY[ev]
+            self.refresh_high()
+        elif ev in (EV_START, EV_RESTART): self.reset_run()
+        elif ev == EV_PAUSE: self.state = self.PAUSED
+        elif ev == EV_RESUME: self.state = self.PLAYING
+        elif ev >= EV_QUALITY: self.set_quality(QUALITY_NAMES[(ev - EV_QUALITY) // 32], (ev - EV_QUALITY) % 32)
+
+    def set_quality(self, name, level):
+        self.quality[name] = level
+        if name == "star_layers": self.starfield.visible = level
+
     def diff_cfg(self): return DIFFICULTIES[self.difficulty]
-    def wave_scaler(self): return 1.0 if not FEATURES["WAVES"] else 1.0 + (self.wave - 1) * 0.11
-    def spawn_rate(self):
-        cfg = self.diff_cfg(); scaler = self.wave_scaler()
-        return (ENEMY_SPAWN_BASE / scaler) * cfg["spawn_mul"]
-    def enemy_speed(self):
-        cfg = self.diff_cfg(); scaler = self.wave_scaler()
-        return ENEMY_BASE_SPEED * cfg["enemy_mul"] * (1.0 + (scaler - 1) * 0.65)
-    def enemy_hp(self):
-        cfg = self.diff_cfg(); scaler = self.wave_scaler()
-        return int(ENEMY_HP * cfg["enemy_mul"] * (1.0 + (scaler - 1) * 0.55))
     def score_mult(self):
         if not FEATURES["COMBO"]: return 1
         m = 1 + (self.combo_kills // COMBO_STEP)
@@ -432,67 +1932,85 @@ class Game:
         if FEATURES["SCREEN_SHAKE"]:
             self.shake = min(24.0, self.shake + amount)
 
-    def maybe_spawn_enemy(self, dt):
-        if self.boss_active: return
-        self.enemy_timer -= dt
-        if self.enemy_timer <= 0:
-            self.enemy_timer = random.uniform(0.75, 1.35) * self.spawn_rate()
-            y = random.uniform(40, HEIGHT - 40); x = WIDTH + 60
-            spd = self.enemy_speed(); hp = self.enemy_hp()
-            if self.wave >= 3 and random.random() < 0.38:
-                self.enemies.append(EnemyShooter((x, y), spd * 0.92, hp=hp + 8))
+    def spawn_enemy(self):
+        # the random stream; paused (spawn_held) while a boss is up
+        wp, rng = self.wp, self.rng
+        self.arm(T_SPAWN, rng.uniform(0.75, 1.35) * wp.spawn_rate)
+        y = rng.uniform(40, HEIGHT - 40); x = WIDTH + 60
+        spd, hp = wp.enemy_speed, wp.enemy_hp
+        if wp.shooters and rng.random() < wp.shooters:
+            self.add_enemy(self.pools[EnemyShooter].acquire((x, y), spd * 0.92, hp=hp + 8, rng=rng))
+        else:
+            self.add_enemy(self.pools[EnemyChaser].acquire((x, y), spd, hp=hp))
+
+    def spawn_powerup(self):
+        rng = self.rng
+        self.arm(T_POWER, rng.uniform(0.7, 1.2) * self.wp.power_rate)
+        y = rng.uniform(60, HEIGHT - 60); x = WIDTH + 40
+        p = rng.random()
+        if p < 0.34: t = "rapid"
+        elif p < 0.62: t = "spread"
+        elif p < 0.84: t = "shield"
+        else: t = "heal"
+        self.powerups.append(self.pools[PowerUp].acquire((x, y), t))
+
+    def add_enemy(self, e):
+        self.enemies.append(e)
+        batch = self.batches.get(type(e))
+        if batch is not None: batch.add(e)
+        else: self.solo.append(e)
+        if isinstance(e, EnemyShooter): self.arm_shot(batch, e.slot, e.fire_cd)
+        return e
+
+    def release(self, obj):
+        if getattr(obj, "batch", None) is not None: obj.batch.remove(obj)
+        pool = self.pools.get(type(obj))
+        if pool is not None: pool.release(obj)
+
+    def compact(self, items):
+        # drop dead entities in place, handing them back to their pool
+        n = 0
+        for it in items:
+            if it.dead:
+                self.release(it)
             else:
-                self.enemies.append(EnemyChaser((x, y), spd, hp=hp))
-
-    def maybe_spawn_powerup(self, dt):
-        if not FEATURES["POWERUPS"]: return
-        self.power_timer -= dt
-        if self.power_timer <= 0:
-            scaler = self.wave_scaler()
-            self.power_timer = random.uniform(0.7, 1.2) * (POWERUP_SPAWN_BASE * (0.95 + scaler * 0.18))
-            y = random.uniform(60, HEIGHT - 60); x = WIDTH + 40
-            p = random.random()
-            if p < 0.34: t = "rapid"
-            elif p < 0.62: t = "spread"
-            elif p < 0.84: t = "shield"
-            else: t = "heal"
-            self.powerups.append(PowerUp((x, y), t))
-
-    def maybe_spawn_boss(self):
-        if not (FEATURES["WAVES"] and FEATURES["BOSS"]): return
-        if self.boss_active: return
-        if self.wave > 1 and self.wave % BOSS_EVERY_WAVES == 0:
-            if self.boss_warning <= 0:
-                self.boss_warning = BOSS_WARNING_TIME
-                self.sound.play("boss")
-
-    def spawn_boss_now(self):
+                items[n] = it
+                n += 1
+        del items[n:]
+
+    def alloc_stats(self):
+        return {cls.__name__: pool.stats() for cls, pool in self.pools.items()}
+
+    def boss_warning_start(self, pattern):
+        if self.boss_active or self.sched.pending(self.timers.get(T_BOSS)): return
+        self.arm(T_BOSS, BOSS_WARNING_TIME, list(BOSS_PATTERNS).index(pattern))
+        self.sound.play("boss")
+
+    def spawn_boss_now(self, pattern=None):
         cfg = self.diff_cfg()
         hp = int(BOSS_HP * cfg["boss_mul"] * (1.0 + (self.wave - 1) * 0.08))
-        self.enemies.append(Boss((WIDTH + 120, HEIGHT * 0.5), hp=hp))
+        self.add_enemy(Boss((WIDTH + 120, HEIGHT * 0.5), hp=hp, pattern=pattern or boss_pattern_for_wave(self.wave)))
         self.boss_active = True
+        self.spawn_held = self.sched.left(self.timers.get(T_SPAWN))
+        self.sched.cancel(self.timers.pop(T_SPAWN, None))
+
+    def boss_killed(self):
+        self.boss_active = False
+        self.arm(T_SPAWN, self.spawn_held)
+        for item in self.wp.timeline:
+            if item.get("repeat") and "boss" in item and FEATURES["BOSS"]:
+                self.boss_warning_start(item["boss"])
+                break
 
     def enemy_killed(self, enemy):
         base = 8 if isinstance(enemy, EnemyShooter) else 6
         self.score += base * self.score_mult()
         if FEATURES["COMBO"]:
             self.combo_kills += 1
-            self.combo_timer = COMBO_WINDOW
+            self.arm(T_COMBO, COMBO_WINDOW)
         self.add_shake(7.0)
         if FEATURES["PARTICLES"]:
-            for _ in range(18):
-                ang = random.uniform(0, math.tau)
-                sp = random.uniform(80, 320)
-                vel = (math.cos(ang) * sp, math.sin(ang) * sp)
-                self.particles.append(Particle(enemy.pos, vel, life=PARTICLE_LIFE, radius=random.randint(2, 4), color=(255, 200, 80)))
-
-    def update_combo(self, dt):
-        if not FEATURES["COMBO"]: return
-        if self.combo_kills > 0:
-            self.combo_timer -= dt
-            if self.combo_timer <= 0:
-                self.combo_kills = 0
-                self.combo_timer = 0.0
+            self.particles.radial(enemy.pos.x, enemy.pos.y, self.quality["kill_particles"], (80, 320), PARTICLE_LIFE, (2, 4), PC_KILL)
 
     def apply_powerup(self, pu: PowerUp):
         self.sound.play("power")
@@ -505,209 +2023,1034 @@ class Game:
         elif pu.ptype == "heal":
             self.player.hp = min(PLAYER_MAX_HP, self.player.hp + 35)
 
+    def save_prev(self):
+        # remember pre-step positions so draw() can interpolate between the last two steps
+        self.player.prev.update(self.player.pos)
+        for e in self.enemies: e.prev.update(e.pos)
+        for pu in self.powerups: pu.prev.update(pu.pos)
+
     def update(self, dt, keys):
-        speed_mul = 1.0 + (self.wave_scaler() - 1) * 0.25
-        for s in self.stars:
-            s.update(dt, speed_mul=speed_mul)
+        prof = self.prof
+        prof.begin()
+        self.clock.advance(dt)
+        self.save_prev()
+        self.starfield.update(dt, speed_mul=self.wp.star_speed)
 
-        for p in self.particles:
-            p.update(dt)
-        self.particles = [p for p in self.particles if not p.dead]
+        self.particles.update(dt)
 
         if self.shake > 0:
             self.shake = max(0.0, self.shake - SHAKE_DECAY * dt)
 
+        prof.lap("fx")
         if self.state != self.PLAYING:
             return
 
         self.time += dt
-
-        if FEATURES["WAVES"] and self.time >= self.wave * WAVE_DURATION:
-            self.wave += 1
-            self.wave_banner = WAVE_BANNER_TIME
-            self.sound.play("power")
-            self.enemy_timer = min(self.enemy_timer, self.spawn_rate())
-
-        if self.wave_banner > 0:
-            self.wave_banner -= dt
-
-        self.maybe_spawn_boss()
-        if self.boss_warning > 0:
-            self.boss_warning -= dt
-            if self.boss_warning <= 0:
-                self.spawn_boss_now()
-
-        self.update_combo(dt)
+        self.run_timers()
 
         self.player.update(dt, keys)
         if keys[pygame.K_SPACE]:
             self.player.shoot(self.bullets, self.sound)
-
-        self.maybe_spawn_enemy(dt)
-        self.maybe_spawn_powerup(dt)
+        prof.lap("spawn")
 
         for pu in self.powerups: pu.update(dt)
-        self.powerups = [p for p in self.powerups if not p.dead]
-
-        for e in self.enemies: e.update(dt, self)
-
-        for b in self.bullets: b.update(dt)
-        self.bullets = [b for b in self.bullets if not b.dead]
-
-        # friendly bullets -> enemies
-        for b in list(self.bullets):
-            if not b.friendly: continue
-            for e in list(self.enemies):
-                if b.collides_circle(e.pos, e.radius):
+        self.compact(self.powerups)
+
+        for cls, batch in self.batches.items(): cls.update_batch(batch, dt, self)
+        for e in self.solo: e.update(dt, self)
+
+        self.bullets.update(dt)
+        prof.lap("entities")
+
+        self.pair_tests = 0
+        enemies, player = self.enemies, self.player
+        bp, grid = self.bullets, self.enemy_grid
+        grid.build(enemies, pad=BULLET_MAX_RADIUS)
+
+        # friendly bullets -> enemies (only bullets whose cell holds an enemy reach Python)
+        if grid.cells:
+            live = bp.alive & bp.friendly
+            idx = np.flatnonzero(live)
+            cells = grid.point_keys(bp.x[idx], bp.y[idx])
+            live[idx] = np.isin(cells, grid.occupied())
+            cand = bp.ordered(live).tolist()
+        else:
+            cand = []
+        for j in cand:
+            bx, by, br = float(bp.x[j]), float(bp.y[j]), int(bp.radius[j])
+            for i in grid.cells[grid.key(math.floor(bx / grid.cell), math.floor(by / grid.cell))]:
+                e = enemies[i]
+                if e.dead_flag: continue
+                self.pair_tests += 1
+                dx, dy = bx - e.pos.x, by - e.pos.y
+                if math.sqrt(dx * dx + dy * dy) <= br + e.radius:
                     e.hit(10, self.sound)
-                    b.life = 0
+                    bp.life[j] = 0
                     self.add_shake(2.0)
                     if FEATURES["PARTICLES"]:
-                        self.particles.append(Particle(b.pos, (random.uniform(-90, 90), random.uniform(-90, 90)), life=0.25, radius=3, color=(220, 240, 255)))
+                        self.particles.scatter(bx, by, 1, 90, 0.25, 3, PC_SPARK)
                     if e.hp <= 0:
                         self.enemy_killed(e)
                         if isinstance(e, Boss):
-                            self.boss_active = False
+                            self.boss_killed()
                             self.score += 120 * self.score_mult()
                             self.sound.play("boom")
                             self.add_shake(12.0)
-                        self.enemies.remove(e)
+                        e.dead_flag = True
                     break
-
-        # enemy bullets -> player
-        for b in list(self.bullets):
-            if b.friendly: continue
-            if b.collides_circle(self.player.pos, self.player.radius):
-                b.life = 0
-                self.player.take_damage(18, self.sound)
+        prof.lap("hit enemies")
+
+        # enemy bullets -> player (vectorized AABB sweep, circle test on the survivors)
+        px, py = player.pos.x, player.pos.y
+        reach = player.radius + BULLET_MAX_RADIUS
+        near = bp.alive & ~bp.friendly
+        near &= np.abs(bp.x - px) <= reach
+        near &= np.abs(bp.y - py) <= reach
+        for j in bp.ordered(near).tolist():
+            self.pair_tests += 1
+            dx, dy = float(bp.x[j]) - px, float(bp.y[j]) - py
+            if math.sqrt(dx * dx + dy * dy) <= int(bp.radius[j]) + player.radius:
+                bp.life[j] = 0
+                player.take_damage(18, self.sound)
                 self.add_shake(10.0)
                 if FEATURES["PARTICLES"]:
-                    for _ in range(12):
-                        self.particles.append(Particle(self.player.pos, (random.uniform(-240, 240), random.uniform(-240, 240)), life=0.45, radius=3, color=(255, 150, 150)))
+                    self.particles.scatter(px, py, self.quality["hit_particles"], 240, 0.45, 3, PC_HURT)
+        prof.lap("hit player")
 
         # ram collisions
-        for e in list(self.enemies):
-            if self.player.pos.distance_to(e.pos) <= (self.player.radius + e.radius):
-                self.player.take_damage(24, self.sound)
+        for i in self.enemy_grid.query(player.pos.x, player.pos.y, player.radius):
+            e = enemies[i]
+            if e.dead_flag: continue
+            self.pair_tests += 1
+            if player.pos.distance_to(e.pos) <= (player.radius + e.radius):
+                player.take_damage(24, self.sound)
                 self.add_shake(12.0)
                 if not isinstance(e, Boss):
-                    self.enemies.remove(e)
+                    e.dead_flag = True
                 if FEATURES["COMBO"]:
                     self.combo_kills = 0
-                    self.combo_timer = 0.0
+                    self.sched.cancel(self.timers.pop(T_COMBO, None))
                 break
+        prof.lap("ram")
+        self.compact(enemies)
+        if self.solo and any(e.dead for e in self.solo): self.solo = [e for e in self.solo if not e.dead]
+        prof.lap("cull")
 
         # powerup pickup
-        for pu in list(self.powerups):
-            if self.player.pos.distance_to(pu.pos) <= (self.player.radius + pu.radius):
+        self.power_grid.build(self.powerups)
+        for i in self.power_grid.query(player.pos.x, player.pos.y, player.radius):
+            pu = self.powerups[i]
+            self.pair_tests += 1
+            if player.pos.distance_to(pu.pos) <= (player.radius + pu.radius):
                 self.apply_powerup(pu)
-                self.powerups.remove(pu)
+                pu.taken = True
+        self.compact(self.powerups)
+        prof.lap("pickup")
 
         if not self.player.alive:
             self.state = self.GAMEOVER
             self.high = max(self.high, self.score)
-            save_highscore(self.high)
+            if self.scores and self.score > 0: self.rank = self.scores.submit(self.difficulty, self.score, self.wave)
+
+    def state_hash(self):
+        # digest of everything the simulation depends on; equal seeds + inputs must give equal hashes
+        h = hashlib.sha1()
+        p = self.player
+        h.update(self.state.encode())
+        h.update(struct.pack("<7d5i", p.pos.x, p.pos.y, p.iframes_until, p.rapid_until, p.spread_until, p.fire_at, self.time,
+                             p.hp, p.shield, self.score, self.wave, self.combo_kills))
+        h.update(struct.pack("<2d?", self.banner_until, self.spawn_held, self.boss_active))
+        for ev in self.sched.live():
+            h.update(self.EVENT.pack(*ev))
+        for e in self.enemies:
+            h.update(type(e).__name__.encode())
+            h.update(struct.pack("<3di", e.pos.x, e.pos.y, e.cooldown(), e.hp))
+        for pu in self.powerups:
+            h.update(struct.pack("<2d", pu.pos.x, pu.pos.y) + pu.ptype.encode())
+        bp = self.bullets
+        idx = bp.ordered(bp.alive)
+        for a in (bp.x, bp.y, bp.vx, bp.vy, bp.life, bp.radius, bp.friendly):
+            h.update(a[idx].tobytes())
+        ps = self.particles
+        for a in (ps.x, ps.y, ps.life):
+            h.update(a[:ps.n].tobytes())
+        h.update(repr(self.rng.getstate()).encode())
+        return h.hexdigest()
+
+    # save_state() layout: fixed-size scalars and RNG states first (identical bytes from step to step,
+    # which is what StateHistory's deltas exploit), then the variable-length entity sections
+    STATE_MAGIC, STATE_VERSION = b"SSST", 2
+    STATES = (MENU, PLAYING, PAUSED, GAMEOVER)
+    ENEMY_KINDS = (EnemyBase, EnemyChaser, EnemyShooter, Boss)
+    STATE_HEAD = struct.Struct(f"<4sBBB??{len(QUALITY_NAMES)}B2q3i5d4didi3dq")
+    STATE_COUNTS = struct.Struct("<B2q6Iq")
+    EVENT = struct.Struct("<dqBqq")
+    MT_STATE = struct.Struct("<625I?d")
+    PCG_STATE = struct.Struct("<16s16siI")
+    ENEMY = struct.Struct("<B4dqi?")
+    BOSS = struct.Struct("<dd?BidB")
+    POWERUP = struct.Struct("<4dBi2d?")
+    BULLET_FIELDS = ("x", "y", "px", "py", "vx", "vy", "life", "radius", "color", "friendly", "seq")
+    PARTICLE_FIELDS = ("x", "y", "px", "py", "vx", "vy", "life", "max_life", "radius", "color")
+
+    @classmethod
+    def _pack_mt(cls, rng):
+        _, words, gauss = rng.getstate()
+        return cls.MT_STATE.pack(*words, gauss is not None, gauss or 0.0)
+
+    @classmethod
+    def _unpack_mt(cls, rng, data, at):
+        v = cls.MT_STATE.unpack_from(data, at)
+        rng.setstate((3, v[:625], v[626] if v[625] else None))
+        return at + cls.MT_STATE.size
+
+    def save_state(self):
+        # the full simulation state as compact binary: load_state() of it continues bit-exactly
+        p, sf, bp, ps = self.player, self.starfield, self.bullets, self.particles
+        parts = [self.STATE_HEAD.pack(
+            self.STATE_MAGIC, self.STATE_VERSION, self.STATES.index(self.state), list(DIFFICULTIES).index(self.difficulty),
+            self.boss_active, ps._rng is not None, *(QUALITY_LEVELS[n].index(self.quality[n]) for n in QUALITY_NAMES),
+            self.score, self.high, self.wave, self.rank, self.combo_kills,
+            self.time, self.banner_until, self.spawn_held, self.shake, self.clock.ms,
+            p.pos.x, p.pos.y, p.prev.x, p.prev.y, p.hp, p.iframes_until, p.shield,
+            p.rapid_until, p.spread_until, p.fire_at, self.sched.order)]
+        parts.append(self._pack_mt(self.rng))
+        parts.append(self._pack_mt(self.fx_rng))
+        if ps._rng is not None:
+            st = ps._rng.bit_generator.state
+            parts.append(self.PCG_STATE.pack(st["state"]["state"].to_bytes(16, "little"), st["state"]["inc"].to_bytes(16, "little"),
+                                             st["has_uint32"], st["uinteger"]))
+        parts.append(struct.pack(f"<{2 * len(sf.scroll)}d", *sf.scroll, *sf.prev))
+        alive = np.flatnonzero(bp.alive)
+        events = self.sched.live()
+        parts.append(self.STATE_COUNTS.pack(sf.visible, self.batches[EnemyChaser].next_seq, self.batches[EnemyShooter].next_seq,
+                                            len(self.enemies), len(self.powerups), len(events), alive.size, bp.nfree, ps.n, bp.next_seq))
+        for e in self.enemies:
+            kind = self.ENEMY_KINDS.index(type(e))
+            parts.append(self.ENEMY.pack(kind, e.pos.x, e.pos.y, e.prev.x, e.prev.y, e.hp, e.radius, e.dead_flag))
+            if kind in (1, 2):
+                b = e.batch
+                parts.append(struct.pack("<ddq", e.speed, e.cooldown(), int(b.seq[e.slot]) if b else -1))
+            elif kind == 3:
+                parts.append(self.BOSS.pack(e.speed, e.phase, e.entering, list(BOSS_PATTERNS).index(e.pattern.name),
+                                            e.stage, e.stage_time, len(e.cds)))
+                parts.append(struct.pack(f"<{len(e.cds)}d{len(e.volleys)}i", *e.cds, *e.volleys))
+        for pu in self.powerups:
+            parts.append(self.POWERUP.pack(pu.pos.x, pu.pos.y, pu.prev.x, pu.prev.y, PowerUp.TYPES.index(pu.ptype),
+                                           pu.radius, pu.vel.x, pu.vel.y, pu.taken))
+        for ev in events:
+            parts.append(self.EVENT.pack(*ev))
+        # slot lists are stored as first differences (mostly +-1), which zlib squeezes to almost nothing
+        parts.append(np.diff(alive, prepend=0).astype(np.int16).tobytes())
+        for name in self.BULLET_FIELDS:
+            parts.append(getattr(bp, name)[alive].tobytes())
+        parts.append(np.diff(bp.free[:bp.nfree], prepend=0).astype(np.int16).tobytes())
+        for name in self.PARTICLE_FIELDS:
+            parts.append(getattr(ps, name)[:ps.n].tobytes())
+        return b"".join(parts)
+
+    def load_state(self, data):
+        head = self.STATE_HEAD.unpack_from(data)
+        if head[0] != self.STATE_MAGIC or head[1] != self.STATE_VERSION:
+            raise ValueError("not a saved game state (or unsupported version)")
+        nq = 6 + len(QUALITY_NAMES)
+        (_, _, state, diff, self.boss_active, has_prng, *q) = head[:nq]
+        (self.score, high, self.wave, self.rank, self.combo_kills,
+         self.time, self.banner_until, self.spawn_held, self.shake, self.clock.ms,
+         x, y, px, py, hp, iframes, shield, rapid, spread, fire_at, order) = head[nq:]
+        self.state, self.difficulty = self.STATES[state], list(DIFFICULTIES)[diff]
+        self.high = max(self.high, high)
+        self.wp = WaveParams(self.wave, self.difficulty)
+        for name, i in zip(QUALITY_NAMES, q): self.set_quality(name, QUALITY_LEVELS[name][i])
+        self.sched.clear(self.time)
+        p = self.player = Player(self.sched)
+        p.pos.update(x, y); p.prev.update(px, py)
+        p.hp, p.shield = hp, shield
+        p.iframes_until, p.rapid_until, p.spread_until, p.fire_at = iframes, rapid, spread, fire_at
+        at = self.STATE_HEAD.size
+        at = self._unpack_mt(self.rng, data, at)
+        at = self._unpack_mt(self.fx_rng, data, at)
+        ps, sf, bp = self.particles, self.starfield, self.bullets
+        ps._rng = None  # without a saved generator state it is created fresh from the seed, as in a new game
+        if has_prng:
+            st, inc, has32, uint = self.PCG_STATE.unpack_from(data, at)
+            ps.rng.bit_generator.state = {"bit_generator": "PCG64", "has_uint32": has32, "uinteger": uint,
+                                          "state": {"state": int.from_bytes(st, "little"), "inc": int.from_bytes(inc, "little")}}
+            at += self.PCG_STATE.size
+        layers = len(sf.scroll)
+        v = struct.unpack_from(f"<{2 * layers}d", data, at)
+        sf.scroll[:], sf.prev[:] = v[:layers], v[layers:]
+        at += 16 * layers
+        visible, chaser_seq, shooter_seq, n_enemies, n_powerups, n_events, n_bullets, nfree, n_particles, bullet_seq = \
+            self.STATE_COUNTS.unpack_from(data, at)
+        at += self.STATE_COUNTS.size
+        sf.visible = visible
+
+        for e in self.enemies: self.release(e)
+        for pu in self.powerups: self.release(pu)
+        self.enemies.clear(); self.solo.clear(); self.powerups.clear()
+        # placeholder seqs handed out by add() below start past every saved one, so reseq() can't collide
+        self.batches[EnemyChaser].next_seq, self.batches[EnemyShooter].next_seq = chaser_seq, shooter_seq
+        for _ in range(n_enemies):
+            kind, x, y, px, py, hp, radius, dead = self.ENEMY.unpack_from(data, at)
+            at += self.ENEMY.size
+            cls = self.ENEMY_KINDS[kind]
+            if kind == 3:
+                speed, phase, entering, pattern, stage, stage_time, n = self.BOSS.unpack_from(data, at)
+                at += self.BOSS.size
+                e = Boss((x, y), hp, list(BOSS_PATTERNS)[pattern])
+                e.speed, e.phase, e.entering = speed, phase, entering
+                e.start_stage(stage)
+                e.stage_time = stage_time
+                v = struct.unpack_from(f"<{n}d{n}i", data, at)
+                at += 12 * n
+                e.cds, e.volleys = list(v[:n]), list(v[n:])
+            elif kind == 0:
+                e = EnemyBase((x, y), hp, radius)
+            else:
+                speed, fire, seq = struct.unpack_from("<ddq", data, at)
+                at += 24
+                # explicit rng and saved shot time, so restoring never reads an RNG (least of all the global one)
+                kw = {"rng": self.rng, "fire_cd": fire - self.time} if cls is EnemyShooter else {}
+                e = self.pools[cls].acquire((x, y), speed, hp=hp, **kw)
+            e.prev.update(px, py)
+            e.radius, e.dead_flag = radius, dead
+            self.add_enemy(e)
+            if e.batch is not None:
+                e.batch.reseq(e, seq)
+                e.batch.fire_at[e.slot] = fire
+        self.batches[EnemyChaser].next_seq, self.batches[EnemyShooter].next_seq = chaser_seq, shooter_seq
+        for _ in range(n_powerups):
+            x, y, px, py, t, radius, vx, vy, taken = self.POWERUP.unpack_from(data, at)
+            at += self.POWERUP.size
+            pu = self.pools[PowerUp].acquire((x, y), PowerUp.TYPES[t])
+            pu.prev.update(px, py); pu.vel.update(vx, vy)
+            pu.radius, pu.taken = radius, taken
+            self.powerups.append(pu)
+        # the saved heap replaces whatever add_enemy() scheduled above
+        events = [self.EVENT.unpack_from(data, at + i * self.EVENT.size) for i in range(n_events)]
+        at += n_events * self.EVENT.size
+        self.sched.restore(self.time, order, events)
+        self.timers = {e[2]: e for e in self.sched.heap if e[2] in T_SINGLE}
+        self.due_shots.clear()
+
+        def take(arr, n):
+            nonlocal at
+            size = n * arr.itemsize
+            v = np.frombuffer(data, arr.dtype, n, at)
+            at += size
+            return v
+        bp.clear()
+        alive = np.cumsum(take(np.empty(0, np.int16), n_bullets), dtype=np.int64)
+        for name in self.BULLET_FIELDS:
+            a = getattr(bp, name)
+            a[alive] = take(a, n_bullets)
+        bp.alive[alive] = True
+        bp.free[:nfree] = np.cumsum(take(np.empty(0, np.int16), nfree))
+        bp.nfree, bp.next_seq = nfree, bullet_seq
+        ps.n = n_particles
+        for name in self.PARTICLE_FIELDS:
+            a = getattr(ps, name)
+            a[:n_particles] = take(a, n_particles)
 
     def shake_offset(self):
         if not (FEATURES["SCREEN_SHAKE"] and self.shake > 0): return (0, 0)
         mag = self.shake
-        return (random.uniform(-mag, mag), random.uniform(-mag, mag))
+        return (self.fx_rng.uniform(-mag, mag), self.fx_rng.uniform(-mag, mag))
 
-    def draw_hud(self, surf, font):
-        surf.blit(font.render(f"Score: {self.score}", True, (240, 240, 245)), (16, 14))
-        surf.blit(font.render(f"High: {self.high}", True, (180, 180, 190)), (16, 40))
+    def hud_values(self):
+        # every value the HUD displays, as a hashable key (also what a Snapshot carries)
+        p = self.player
+        bar_w = 220
+        pt = []
+        if p.rapid_time > 0: pt.append(f"RAPID {p.rapid_time:0.1f}s")
+        if p.spread_time > 0: pt.append(f"SPREAD {p.spread_time:0.1f}s")
+        combo = FEATURES["COMBO"] and self.combo_kills > 0
+        return (self.score, self.high, self.wave, int(bar_w * clamp(p.hp / PLAYER_MAX_HP, 0, 1)),
+                int(bar_w * clamp(p.shield / SHIELD_HP, 0, 1)) if p.shield > 0 else -1,
+                " | ".join(pt), (self.combo_kills, self.score_mult()) if combo else None)
+
+    def overlay_values(self):
+        playing = self.state == self.PLAYING
+        return (self.state, self.score, self.high, self.rank, self.difficulty, self.wave,
+                FEATURES["WAVES"] and self.banner_until > self.time and playing,
+                self.sched.pending(self.timers.get(T_BOSS)) and playing,
+                self.quality["banner_panels"])
+
+    def draw_hud(self, surf, font, key=None):
+        if key is None: key = self.hud_values()
+        if key != self.hud_key:
+            self.hud_key = key
+            self.hud_seq = self.compose_hud(font, key)
+        surf.blits(self.hud_seq, doreturn=False)
+
+    def compose_hud(self, font, key):
+        # rebuilt only when a displayed value changes; every surface comes from the LRU cache
+        score, high, wave, hp_w, shield_w, powers, combo = key
+        tc = self.text_cache
+        seq = [(tc.text(font, f"Score: {score}", (240, 240, 245)), (16, 14)),
+               (tc.text(font, f"High: {high}", (180, 180, 190)), (16, 40))]
         if FEATURES["WAVES"]:
-            surf.blit(font.render(f"Wave: {self.wave}", True, (210, 220, 240)), (16, 66))
+            seq.append((tc.text(font, f"Wave: {wave}", (210, 220, 240)), (16, 66)))
 
         x, y = 16, 94
         bar_w, bar_h = 220, 12
-        pygame.draw.rect(surf, (40, 40, 60), (x, y, bar_w, bar_h), border_radius=6)
-        frac = clamp(self.player.hp / PLAYER_MAX_HP, 0, 1)
-        pygame.draw.rect(surf, (220, 220, 245), (x, y, int(bar_w * frac), bar_h), border_radius=6)
-        surf.blit(font.render("HP", True, (200, 200, 210)), (x + bar_w + 10, y - 2))
+        seq.append((tc.bar(bar_w, bar_h, hp_w, (220, 220, 245)), (x, y)))
+        seq.append((tc.text(font, "HP", (200, 200, 210)), (x + bar_w + 10, y - 2)))
 
-        if self.player.shield > 0:
+        if shield_w >= 0:
             sy = y + 18
-            pygame.draw.rect(surf, (40, 40, 60), (x, sy, bar_w, 10), border_radius=6)
-            sfrac = clamp(self.player.shield / SHIELD_HP, 0, 1)
-            pygame.draw.rect(surf, (110, 190, 255), (x, sy, int(bar_w * sfrac), 10), border_radius=6)
-            surf.blit(font.render("SHIELD", True, (180, 210, 240)), (x + bar_w + 10, sy - 4))
+            seq.append((tc.bar(bar_w, 10, shield_w, (110, 190, 255)), (x, sy)))
+            seq.append((tc.text(font, "SHIELD", (180, 210, 240)), (x + bar_w + 10, sy - 4)))
 
-        pt = []
-        if self.player.rapid_time > 0: pt.append(f"RAPID {self.player.rapid_time:0.1f}s")
-        if self.player.spread_time > 0: pt.append(f"SPREAD {self.player.spread_time:0.1f}s")
-        if pt:
-            surf.blit(font.render(" | ".join(pt), True, (220, 240, 220)), (16, 130))
+        if powers:
+            seq.append((tc.text(font, powers, (220, 240, 220)), (16, 130)))
 
-        if FEATURES["COMBO"] and self.combo_kills > 0:
-            surf.blit(font.render(f"Combo: {self.combo_kills}  x{self.score_mult()}", True, (255, 235, 160)), (WIDTH - 220, 16))
+        if combo:
+            seq.append((tc.text(font, f"Combo: {combo[0]}  x{combo[1]}", (255, 235, 160)), (WIDTH - 220, 16)))
+        return seq
 
-    def draw_overlays(self, surf, font, bigfont):
-        if self.state == self.MENU:
+    def draw_overlays(self, surf, font, bigfont, values=None):
+        state, score, high, rank, difficulty, wave, banner, warning, panels = values or self.overlay_values()
+        if state == self.MENU:
             self._center(surf, bigfont, "SPACE SHOOTER", 160)
             self._center(surf, font, "1=Easy  2=Normal  3=Hard   |   ENTER to Start", 225)
             self._center(surf, font, "Move: WASD/Arrows | Shoot: SPACE (hold) | Shift: Slow | P: Pause", 255)
             self._center(surf, font, "Power-ups: Rapid / Spread / Shield / Heal", 285)
             self._center(surf, font, "Boss appears every few waves (if enabled).", 315)
-        elif self.state == self.PAUSED:
+        elif state == self.PAUSED:
             self._center(surf, bigfont, "PAUSED", 210)
             self._center(surf, font, "Press P to resume", 260)
-        elif self.state == self.GAMEOVER:
+        elif state == self.GAMEOVER:
             self._center(surf, bigfont, "GAME OVER", 200)
-            self._center(surf, font, f"Score: {self.score}   High: {self.high}", 255)
+            self._center(surf, font, f"Score: {score}   High: {high}", 255)
             self._center(surf, font, "Press R to restart or ESC to quit", 285)
+            if rank:
+                self._center(surf, font, f"#{rank} on the {difficulty} leaderboard", 320)
 
-        if FEATURES["WAVES"] and self.wave_banner > 0 and self.state == self.PLAYING:
-            txt = font.render(f"Wave {self.wave}", True, (250, 250, 255))
-            rect = txt.get_rect(center=(WIDTH // 2, 80))
-            bg = pygame.Surface((rect.width + 28, rect.height + 16), pygame.SRCALPHA)
-            bg.fill((0, 0, 0, 120))
-            surf.blit(bg, (rect.x - 14, rect.y - 8))
-            surf.blit(txt, rect)
-
-        if self.boss_warning > 0 and self.state == self.PLAYING:
-            txt = font.render("WARNING: BOSS INCOMING", True, (255, 220, 220))
-            rect = txt.get_rect(center=(WIDTH // 2, 110))
-            bg = pygame.Surface((rect.width + 28, rect.height + 16), pygame.SRCALPHA)
-            bg.fill((50, 0, 0, 120))
-            surf.blit(bg, (rect.x - 14, rect.y - 8))
-            surf.blit(txt, rect)
+        if banner:
+            self._banner(surf, font, f"Wave {wave}", (250, 250, 255), (0, 0, 0, 120), 80, panels)
 
-    @staticmethod
-    def _center(surf, font, text, y):
-        s = font.render(text, True, (245, 245, 250))
+        if warning:
+            self._banner(surf, font, "WARNING: BOSS INCOMING", (255, 220, 220), (50, 0, 0, 120), 110, panels)
+
+    def _banner(self, surf, font, text, color, bg_rgba, y, panels):
+        txt = self.text_cache.text(font, text, color)
+        rect = txt.get_rect(center=(WIDTH // 2, y))
+        if panels:
+            surf.blit(self.text_cache.panel(rect.width + 28, rect.height + 16, bg_rgba), (rect.x - 14, rect.y - 8))
+        surf.blit(txt, rect)
+
+    def _center(self, surf, font, text, y):
+        s = self.text_cache.text(font, text, (245, 245, 250))
         surf.blit(s, s.get_rect(center=(WIDTH // 2, y)))
 
-    def draw(self, screen, font, bigfont):
+    @staticmethod
+    def lerp_offset(ent, offset, alpha):
+        # offset that draws ent at prev + (pos - prev) * alpha
+        k = alpha - 1.0
+        return (offset[0] + (ent.pos.x - ent.prev.x) * k, offset[1] + (ent.pos.y - ent.prev.y) * k)
+
+    def blit_layer(self, screen, items, offset, alpha):
+        # one Surface.blits call for a list of entities carrying a .sprite key
+        sp = self.atlas.sprites
+        ox, oy = offset
+        k = alpha - 1.0
+        seq = []
+        for it in items:
+            surf, ax, ay = sp[it.sprite]
+            p, q = it.pos, it.prev
+            seq.append((surf, (int(p.x + ox + (p.x - q.x) * k) - ax, int(p.y + oy + (p.y - q.y) * k) - ay)))
+        screen.blits(seq, doreturn=False)
+
+    def capture(self, snap):
+        # copy the drawable state into snap's flat arrays (see Snapshot)
+        items = self.powerups + self.enemies
+        ents = snap.ents.reserve(len(items))
+        n = ents.n
+        ents.x[:n] = [it.pos.x for it in items]
+        ents.y[:n] = [it.pos.y for it in items]
+        ents.px[:n] = [it.prev.x for it in items]
+        ents.py[:n] = [it.prev.y for it in items]
+        kid = Snapshot.KIND_ID
+        ents.kind[:n] = [kid[it.sprite] for it in items]
+        bosses = [e for e in self.solo if isinstance(e, Boss)]
+        bars = snap.bars.reserve(len(bosses))
+        for i, e in enumerate(bosses):
+            bars.x[i], bars.y[i], bars.px[i], bars.py[i] = e.pos.x, e.pos.y, e.prev.x, e.prev.y
+            bars.frac[i], bars.radius[i] = clamp(e.hp / BOSS_HP, 0, 1), e.radius
+        snap.bullets.take(self.bullets, np.flatnonzero(self.bullets.alive))
+        snap.particles.copy(self.particles, self.particles.n)
+        p = self.player
+        snap.player = (p.pos.x, p.pos.y, p.prev.x, p.prev.y)
+        snap.player_visible = not p.blinking(self.clock.get_ticks())
+        snap.shield = p.shield > 0
+        sf = self.starfield
+        snap.stars = (tuple(sf.scroll), tuple(sf.prev), sf.visible)
+        snap.offset = self.shake_offset()
+        snap.hud = self.hud_values()
+        snap.overlay = self.overlay_values()
+        snap.counts = self.entity_counts()
+        return snap
+
+    def draw_snapshot(self, screen, font, bigfont, snap, alpha, prof):
+        # the render thread's draw: reads only snap plus the draw-side caches (atlas, text cache, HUD)
+        prof.begin()
+        offset = snap.offset
+        screen.fill((16, 18, 28))
+        self.starfield.draw(screen, offset, alpha, snap.stars)
+        prof.lap("background")
+        if self.atlas is None: self.atlas = SpriteAtlas()
+        sp, kinds = self.atlas.sprites, Snapshot.KINDS
+        k = alpha - 1.0
+        e = snap.ents
+        n = e.n
+        xs = (e.x[:n] + offset[0] + (e.x[:n] - e.px[:n]) * k).astype(np.int64).tolist()
+        ys = (e.y[:n] + offset[1] + (e.y[:n] - e.py[:n]) * k).astype(np.int64).tolist()
+        seq = []
+        for x, y, kind in zip(xs, ys, e.kind[:n].tolist()):
+            surf, ax, ay = sp[kinds[kind]]
+            seq.append((surf, (x - ax, y - ay)))
+        screen.blits(seq, doreturn=False)
+        b = snap.bars
+        for i in range(b.n):
+            x = int(b.x[i] + offset[0] + (b.x[i] - b.px[i]) * k)
+            y = int(b.y[i] + offset[1] + (b.y[i] - b.py[i]) * k)
+            Boss.hp_bar(screen, x, y, int(b.radius[i]), float(b.frac[i]))
+        self.bullets.draw(screen, offset, alpha, self.atlas, snap.bullets)
+        if snap.player_visible:
+            x, y, px, py = snap.player
+            self.blit_player(screen, int(x + offset[0] + (x - px) * k), int(y + offset[1] + (y - py) * k), snap.shield)
+        prof.lap("draw ents")
+        if FEATURES["PARTICLES"]:
+            self.particles.draw(screen, offset, alpha, snap.particles)
+        prof.lap("particles")
+        self.draw_hud(screen, font, snap.hud)
+        prof.lap("hud")
+        self.draw_overlays(screen, font, bigfont, snap.overlay)
+        prof.lap("overlays")
+        prof.draw(screen, font, snap.counts)
+
+    def entity_counts(self):
+        # pairs = narrow-phase collision tests in the last update
+        return {"enemies": len(self.enemies), "bullets": len(self.bullets),
+                "particles": len(self.particles), "powerups": len(self.powerups), "pairs": self.pair_tests}
+
+    def draw(self, screen, font, bigfont, alpha=1.0):
+        prof = self.prof
+        prof.begin()
         offset = self.shake_offset()
         screen.fill((16, 18, 28))
-        for s in self.stars: s.draw(screen, offset)
-        for pu in self.powerups: pu.draw(screen, offset)
-        for e in self.enemies: e.draw(screen, offset)
-        for b in self.bullets: b.draw(screen, offset)
-        self.player.draw(screen, offset)
+        self.starfield.draw(screen, offset, alpha)
+        prof.lap("background")
+        if self.use_sprites:
+            if self.atlas is None: self.atlas = SpriteAtlas()
+            self.draw_sprites(screen, offset, alpha)
+        else:
+            self.draw_primitives(screen, offset, alpha)
+        prof.lap("draw ents")
         if FEATURES["PARTICLES"]:
-            for p in self.particles: p.draw(screen, offset)
+            self.particles.draw(screen, offset, alpha)
+        prof.lap("particles")
         self.draw_hud(screen, font)
+        prof.lap("hud")
         self.draw_overlays(screen, font, bigfont)
-
-def main():
-    pygame.init()
+        prof.lap("overlays")
+        prof.draw(screen, font, self.entity_counts())
+
+    def draw_sprites(self, screen, offset, alpha):
+        self.blit_layer(screen, self.powerups, offset, alpha)
+        self.blit_layer(screen, self.enemies, offset, alpha)
+        for e in self.enemies:
+            if isinstance(e, Boss):
+                x, y = self.lerp_offset(e, offset, alpha)
+                e.draw_bar(screen, int(e.pos.x + x), int(e.pos.y + y))
+        self.bullets.draw(screen, offset, alpha, self.atlas)
+        p = self.player
+        if not p.blinking(self.clock.get_ticks()):
+            x, y = self.lerp_offset(p, offset, alpha)
+            self.blit_player(screen, int(p.pos.x + x), int(p.pos.y + y), p.shield > 0)
+
+    def blit_player(self, screen, x, y, shield):
+        sp = self.atlas.sprites
+        seq = [(sp["player"][0], (x - 20, y - 12))]
+        if shield: seq.append((sp["player_shield"][0], (x - 28, y - 28)))
+        screen.blits(seq, doreturn=False)
+
+    def draw_primitives(self, screen, offset, alpha):
+        if alpha < 1.0:
+            lo = self.lerp_offset
+            for pu in self.powerups: pu.draw(screen, lo(pu, offset, alpha))
+            for e in self.enemies: e.draw(screen, lo(e, offset, alpha))
+        else:
+            for pu in self.powerups: pu.draw(screen, offset)
+            for e in self.enemies: e.draw(screen, offset)
+        self.bullets.draw(screen, offset, alpha)
+        self.player.draw(screen, self.lerp_offset(self.player, offset, alpha), self.clock.get_ticks())
+
+def simulate(frames=3600, seed=0, difficulty="Normal", dt=1.0 / FPS, inputs=scripted_input, stop_on_gameover=True,
+             history=None):
+    # headless run at a fixed dt: no window, no sound, no wall clock; returns a result dict.
+    # history: a StateHistory that captures every step (its cost is included in the wall time)
+    game = Game(SoundManager(False), seed=seed, persist=False)
+    game.difficulty = difficulty
+    game.reset_run()
+    n = 0
+    t0 = time.perf_counter()
+    while n < frames:
+        game.update(dt, inputs(n, game))
+        if history is not None: history.capture(game)
+        n += 1
+        if stop_on_gameover and game.state == Game.GAMEOVER: break
+    wall = time.perf_counter() - t0
+    return {
+        "frames": n, "sim_seconds": n * dt, "wall_seconds": wall, "fps": n / wall if wall > 0 else float("inf"),
+        "score": game.score, "wave": game.wave, "state": game.state, "hash": game.state_hash(), "game": game,
+    }
+
+class Recorder:
+    # session recording: seed + tick rate, then a delta-encoded token stream of varints
+    # (n << 2 | kind): STEP runs n fixed steps with the current input bits, BITS sets the bits to n,
+    # EVENT issues command n. A footer holds the step count, score and state hash to verify against.
+    # VERSION_STATE files start from a saved Game state (quick load, --jump-in), zlib'd after the header.
+    # 3/4: event-heap timers (1/2 were recorded with per-frame countdowns and no longer reproduce)
+    MAGIC, VERSION, VERSION_STATE = b"SSRP", 3, 4
+    HEADER = struct.Struct("<4sBQHI")
+    FOOTER = struct.Struct("<Iq20s")
+    STEP, BITS, EVENT = 0, 1, 2
+    def __init__(self, seed, tick_rate, start=None):
+        self.seed, self.tick_rate = seed, tick_rate
+        self.start = start
+        self.body = bytearray()
+        self.bits = 0
+        self.run = 0
+        self.steps = 0
+    def _put(self, n, kind):
+        v = n << 2 | kind
+        while v >= 0x80:
+            self.body.append(v & 0x7F | 0x80)
+            v >>= 7
+        self.body.append(v)
+    def _flush(self):
+        if self.run:
+            self._put(self.run, self.STEP)
+            self.run = 0
+    def step(self, bits):
+        if bits != self.bits:
+            self._flush()
+            self._put(bits, self.BITS)
+            self.bits = bits
+        self.run += 1
+        self.steps += 1
+    def event(self, ev):
+        self._flush()
+        self._put(ev, self.EVENT)
+    def mark(self):
+        return len(self.body), self.run, self.bits, self.steps
+    def truncate(self, mark):
+        # back to an earlier mark(): what was recorded after it is forgotten (rewind)
+        n, self.run, self.bits, self.steps = mark
+        del self.body[n:]
+    def save(self, path, game, writer=None):
+        # writer: a ScoreStore whose thread does the disk work; None writes here and now
+        self._flush()
+        if self.start is None:
+            head = self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, self.tick_rate, len(self.body))
+        else:
+            start = zlib.compress(self.start)
+            head = self.HEADER.pack(self.MAGIC, self.VERSION_STATE, self.seed, self.tick_rate, len(self.body)) + struct.pack("<I", len(start)) + start
+        data = head + self.body + self.FOOTER.pack(self.steps, game.score, bytes.fromhex(game.state_hash()))
+        if writer is not None:
+            writer.write(path, data)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            atomic_write(path, data)
+        return len(data)
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed, tick_rate, size = Recorder.HEADER.unpack_from(data)
+    if magic != Recorder.MAGIC:
+        raise ValueError(f"{path}: not a replay file")
+    if version not in (Recorder.VERSION, Recorder.VERSION_STATE):
+        raise ValueError(f"{path}: replay version {version} is not supported by this build")
+    start = Recorder.HEADER.size
+    state = None
+    if version == Recorder.VERSION_STATE:
+        n, = struct.unpack_from("<I", data, start)
+        state = zlib.decompress(data[start + 4:start + 4 + n])
+        start += 4 + n
+    steps, score, digest = Recorder.FOOTER.unpack_from(data, start + size)
+    return {"seed": seed, "tick_rate": tick_rate, "start": state, "body": data[start:start + size],
+            "steps": steps, "score": score, "hash": digest.hex(), "bytes": len(data)}
+
+def replay_tokens(body):
+    v = shift = 0
+    for b in body:
+        v |= (b & 0x7F) << shift
+        if b & 0x80:
+            shift += 7
+            continue
+        yield v & 3, v >> 2
+        v = shift = 0
+
+def play_replay(path, render=False, stop_at=None, capture=None):
+    # re-run a recorded session through Game.update; headless runs as fast as possible,
+    # render=True shows it in a window at the recorded tick rate. stop_at=N stops after N steps
+    # and also returns the Game (for --jump-in). capture=PATH writes every step as a video frame
+    # (see FrameCapture); headless, that draws offscreen and waits for the writer instead of dropping.
+    rec = load_replay(path)
+    step = 1.0 / rec["tick_rate"]
+    if render:
+        pygame.init()
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        clock = pygame.time.Clock()
+    elif capture:
+        pygame.font.init()
+        screen = pygame.Surface((WIDTH, HEIGHT))
+    if render or capture:
+        font, bigfont = pygame.font.Font(None, 24), pygame.font.Font(None, 60)
+    cap = FrameCapture(capture, (WIDTH, HEIGHT), rec["tick_rate"], block=not render) if capture else None
+    game = Game(SoundManager(render and FEATURES["SOUNDS"]), seed=rec["seed"], persist=False)
+    if rec["start"] is not None: game.load_state(rec["start"])
+    keys = InputState()
+    n = 0
+    t0 = time.perf_counter()
+    for kind, v in replay_tokens(rec["body"]):
+        if n == stop_at: break
+        if kind == Recorder.BITS:
+            keys = InputState(v)
+        elif kind == Recorder.EVENT:
+            game.command(v)
+        else:
+            for _ in range(v):
+                if n == stop_at: break
+                game.update(step, keys)
+                n += 1
+                if render or cap is not None:
+                    game.draw(screen, font, bigfont)
+                    if cap is not None: cap.grab(screen)
+                if render:
+                    pygame.display.flip()
+                    pygame.event.pump()
+                    clock.tick(rec["tick_rate"])
+    if cap is not None: cap.close()
+    wall = time.perf_counter() - t0
+    if render: pygame.quit()
+    h = game.state_hash()
+    return {"frames": n, "sim_seconds": n * step, "wall_seconds": wall, "fps": n / wall if wall > 0 else float("inf"),
+            "score": game.score, "hash": h, "bytes": rec["bytes"], "seed": rec["seed"], "game": game,
+            "capture": cap and cap.report(), "ok": n == rec["steps"] and game.score == rec["score"] and h == rec["hash"]}
+
+class StateHistory:
+    # memory-budgeted ring of Game.save_state() blobs for rewind. Every `keyframe`-th entry is stored
+    # zlib-compressed whole; the others as the compressed XOR against their keyframe, so the fixed
+    # part of the layout (scalars, RNG states, free slots) costs next to nothing. Restoring is one
+    # keyframe (cached) plus one delta. Over budget, the oldest keyframe group is dropped.
+    def __init__(self, budget_mb=HISTORY_BUDGET_MB, keyframe=HISTORY_KEYFRAME):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.keyframe = keyframe
+        self.entries = deque()  # (is_key, blob, raw size, recorder mark)
+        self.bytes = 0
+        self.key = None         # newest keyframe's raw bytes: the base for new deltas
+        self.since_key = 0
+        self.cache = (None, None)  # (keyframe blob, raw bytes) last decoded on restore
+        self.capture_t = deque(maxlen=600)
+        self.restore_t = deque(maxlen=600)
+        self.raw = deque(maxlen=600)
+    def __len__(self): return len(self.entries)
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+        self.key = None
+    @staticmethod
+    def _xor(a, b):
+        out = np.zeros(max(len(a), len(b)), np.uint8)
+        out[:len(a)] = np.frombuffer(a, np.uint8)
+        out[:len(b)] ^= np.frombuffer(b, np.uint8)
+        return out.tobytes()
+    def capture(self, game, rec=None):
+        t0 = time.perf_counter()
+        raw = game.save_state()
+        if self.key is None or self.since_key >= self.keyframe:
+            self.key, self.since_key = raw, 0
+            entry = (True, zlib.compress(raw, 1), len(raw), rec and rec.mark())
+        else:
+            entry = (False, zlib.compress(self._xor(raw, self.key), 1), len(raw), rec and rec.mark())
+        self.since_key += 1
+        self.entries.append(entry)
+        self.bytes += len(entry[1])
+        while self.bytes > self.budget and len(self.entries) > 1:
+            self.bytes -= len(self.entries.popleft()[1])
+            while self.entries and not self.entries[0][0]:
+                self.bytes -= len(self.entries.popleft()[1])
+        if not self.entries: self.key = None
+        self.capture_t.append(time.perf_counter() - t0)
+        self.raw.append(len(raw))
+    def _decode(self, i):
+        is_key, blob, size, mark = self.entries[i]
+        k = i
+        while not self.entries[k][0]: k -= 1
+        kblob = self.entries[k][1]
+        if self.cache[0] is not kblob: self.cache = (kblob, zlib.decompress(kblob))
+        if is_key: return self.cache[1]
+        return self._xor(zlib.decompress(blob), self.cache[1])[:size]
+    def rewind(self, game, rec=None):
+        # drop the newest entry and restore the one before it; False when there is nothing left
+        if len(self.entries) < 2: return False
+        t0 = time.perf_counter()
+        self.bytes -= len(self.entries.pop()[1])
+        game.load_state(self._decode(-1))
+        mark = self.entries[-1][3]
+        if rec is not None and mark is not None: rec.truncate(mark)
+        # new captures continue the newest surviving keyframe group
+        k = len(self.entries) - 1
+        while not self.entries[k][0]: k -= 1
+        self.key, self.since_key = self._decode(k), len(self.entries) - k
+        self.restore_t.append(time.perf_counter() - t0)
+        return True
+    def stats(self, tick_rate=TICK_RATE):
+        n = len(self.entries)
+        seconds = n / tick_rate
+        keys = sum(1 for e in self.entries if e[0])
+        return {"entries": n, "keyframes": keys, "seconds": seconds, "bytes": self.bytes,
+                "bytes_per_s": self.bytes / seconds if seconds else 0.0,
+                "raw_avg": float(np.mean(self.raw)) if self.raw else 0.0,
+                "capture_us": float(np.mean(self.capture_t)) * 1e6 if self.capture_t else 0.0,
+                "restore_us": float(np.mean(self.restore_t)) * 1e6 if self.restore_t else 0.0}
+    def report(self, tick_rate=TICK_RATE):
+        s = self.stats(tick_rate)
+        return (f"history: {s['entries']} states ({s['seconds']:.1f}s, {s['keyframes']} keyframes) in {s['bytes'] / 1048576:.2f} MiB "
+                f"= {s['bytes_per_s'] / 1024:.1f} KiB/s of play; capture {s['capture_us']:.0f} us, restore {s['restore_us']:.0f} us, "
+                f"{s['raw_avg'] / 1024:.1f} KiB raw per state")
+
+class Session:
+    # a live run's recording, rewind history and quick-save slot; both main loops step through it
+    def __init__(self, game, seed, tick_rate, record=True, history_mb=HISTORY_BUDGET_MB, start=None):
+        self.game, self.seed, self.tick_rate, self.record = game, seed, tick_rate, record
+        self.hist = StateHistory(history_mb) if history_mb > 0 else None
+        self.quick = None
+        self.parts = 0
+        self.new_recording(start)
+    def new_recording(self, start=None):
+        self.rec = Recorder(self.seed, self.tick_rate, start)
+        self.played = start is not None   # a recording with no run in it (menu, then quit) isn't saved
+        part = f"-{self.parts}" if self.parts else ""
+        self.path = os.path.join(REPLAY_DIR, time.strftime("%Y%m%d-%H%M%S") + f"-{self.seed:016x}{part}.ssr")
+        self.parts += 1
+    def save_recording(self):
+        if self.record and self.played and self.rec.steps: self.rec.save(self.path, self.game, self.game.scores)
+    def command(self, ev):
+        self.game.command(ev)
+        self.rec.event(ev)
+        if ev in (EV_START, EV_RESTART): self.played = True
+    def step(self, dt, keys, rewinding=False):
+        # one fixed step forwards, or (rewinding) one captured state backwards
+        game = self.game
+        if rewinding and self.hist is not None:
+            self.hist.rewind(game, self.rec)
+            return
+        was_over = game.state == Game.GAMEOVER
+        game.update(dt, keys)
+        self.rec.step(keys.bits)
+        if self.hist is not None and game.state == Game.PLAYING: self.hist.capture(game, self.rec)
+        if game.state == Game.GAMEOVER and not was_over:
+            # the run is scored and saved; rewinding into it would let it end (and submit) a second time
+            self.save_recording()
+            if self.hist is not None: self.hist.clear()
+    def quick_save(self):
+        self.quick = self.game.save_state()
+        if self.game.scores is not None:
+            self.game.scores.write(QUICKSAVE_FILE, self.quick)   # fsync + rename off the game thread
+        else:
+            os.makedirs(REPLAY_DIR, exist_ok=True)
+            atomic_write(QUICKSAVE_FILE, self.quick)
+    def quick_load(self):
+        data = self.quick
+        if data is None and os.path.exists(QUICKSAVE_FILE):
+            with open(QUICKSAVE_FILE, "rb") as f: data = f.read()
+        if data is None: return
+        if self.game.state == Game.GAMEOVER:
+            print("quick load: the run is over, restart first")
+            return
+        if data[:5] != Game.STATE_MAGIC + bytes([Game.STATE_VERSION]):
+            print(f"{QUICKSAVE_FILE}: saved by an older version, not loaded")
+            return
+        # the recording so far ends here; the next one starts from the loaded state
+        self.save_recording()
+        backup = self.game.save_state()
+        try:
+            self.game.load_state(data)
+        except (struct.error, zlib.error, ValueError, IndexError, KeyError) as e:
+            # truncated / corrupt file: put the run back as it was and keep playing
+            self.game.load_state(backup)
+            print(f"{QUICKSAVE_FILE}: damaged, not loaded ({e})")
+            return
+        self.new_recording(data)
+        if self.hist is not None: self.hist.clear()
+
+class SimThread:
+    # --render-thread: runs the Session at the tick rate on its own thread and publishes a Snapshot
+    # after each batch of steps. The main thread samples input into `bits` / `rewinding`, post()s
+    # commands (or callables such as session.quick_load) and draws exchange.latest(); it never
+    # touches simulation state.
+    def __init__(self, session, tick_rate, max_catchup):
+        self.session = session
+        self.game = session.game
+        self.step = 1.0 / tick_rate
+        self.max_catchup = max_catchup
+        self.exchange = SnapshotExchange()
+        self.bits = 0
+        self.rewinding = False
+        self.commands = deque()
+        self.error = None
+        self.capture_t = deque(maxlen=600)
+        self.capture_bytes = deque(maxlen=600)
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="sim", daemon=True)
+    def post(self, ev): self.commands.append(ev)
+    def start(self):
+        self.publish()
+        self.thread.start()
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+    def publish(self):
+        t0 = time.perf_counter()
+        snap = self.game.capture(self.exchange.back)
+        snap.time = t1 = time.perf_counter()
+        self.exchange.publish()
+        self.capture_t.append(t1 - t0)
+        self.capture_bytes.append(snap.nbytes)
+    def run(self):
+        try: self.loop()
+        except BaseException as e: self.error = e
+    def loop(self):
+        session, step = self.session, self.step
+        keys = InputState()
+        pc = time.perf_counter
+        next_t = pc()
+        while not self.stopping.is_set():
+            now = pc()
+            if now < next_t:
+                time.sleep(next_t - now)
+                continue
+            steps = 0
+            while now >= next_t and steps < self.max_catchup:
+                while self.commands:
+                    ev = self.commands.popleft()
+                    if callable(ev): ev()
+                    else: session.command(ev)
+                keys.bits = self.bits
+                session.step(step, keys, self.rewinding)
+                next_t += step
+                steps += 1
+            if now >= next_t: next_t = now   # drop the backlog rather than spiral
+            self.publish()
+    def report(self):
+        ex = self.exchange
+        t = np.array(self.capture_t) * 1e6
+        return (f"render thread: {ex.published} snapshots published, {ex.skipped} replaced before drawn; "
+                f"capture {t.mean():.0f} us avg / {t.max():.0f} us max, {np.mean(self.capture_bytes) / 1024:.1f} KiB avg")
+
+def run_threaded(game, screen, font, bigfont, pacer, gov, sim, cap=None, gcc=None):
+    # main-thread half of --render-thread: input and events in, the latest snapshot out to the screen
+    prof = Profiler(game.prof.enabled)
+    game.prof.enabled = False  # the sim thread's laps would race the overlay; this one times the draw
+    sim.start()
+    running = True
+    while running and sim.error is None:
+        pacer.wait()
+        pressed = pygame.key.get_pressed()
+        sim.bits = InputState.from_pressed(pressed).bits
+        sim.rewinding = pressed[pygame.K_BACKSPACE] and game.state != Game.MENU
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                if event.key == pygame.K_F3:
+                    prof.toggle()
+                if event.key == pygame.K_F5:
+                    sim.post(sim.session.quick_save)
+                if event.key == pygame.K_F9:
+                    sim.post(sim.session.quick_load)
+                ev = game.key_command(event.key)
+                if ev is not None: sim.post(ev)
+        snap = sim.exchange.latest()
+        alpha = min(1.0, (time.perf_counter() - snap.time) / sim.step)
+        game.draw_snapshot(screen, font, bigfont, snap, alpha, prof)
+        if cap is not None: cap.grab(screen)
+        pacer.present()
+        if gcc is not None: gcc.frame(game, pacer.last_work(), prof)
+        prof.end_frame()
+        if gov is not None:
+            ev = gov.observe(pacer.last_work(), game.quality)
+            if ev is not None: sim.post(ev)
+    sim.stop()
+    if sim.error is not None: raise sim.error
+
+def main(tick_rate=TICK_RATE, max_catchup=MAX_CATCHUP_STEPS, timing=False, profile=False, record=True, governor=True,
+         pacing="classic", spin_ms=0.0, vsync=False, render_thread=False, history_mb=HISTORY_BUDGET_MB, resume=None,
+         capture=None, gc_mode="managed"):
+    # resume=(seed, state): start from a saved Game state (--jump-in) instead of the menu
+    # only display + font are needed for the menu frame; the mixer and clips load on a thread
+    marks = [("import", time.perf_counter())]
+    pygame.display.init()
+    pygame.font.init()
     flags = 0
     if FEATURES["FULLSCREEN"]:
         flags = pygame.FULLSCREEN | pygame.SCALED
     pygame.display.set_caption("Space Shooter ")
-    screen = pygame.display.set_mode((WIDTH, HEIGHT), flags)
-    clock = pygame.time.Clock()
+    if vsync:
+        # SDL only honours vsync on a renderer-backed window
+        try:
+            screen = pygame.display.set_mode((WIDTH, HEIGHT), flags | pygame.SCALED, vsync=1)
+        except pygame.error as e:
+            print(f"vsync unavailable ({e}); presenting without it")
+            vsync = False
+    if not vsync:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), flags)
+    pacer = FramePacer(FPS, pacing, spin_ms / 1000.0, vsync)
     font = pygame.font.Font(None, 24)
     bigfont = pygame.font.Font(None, 60)
-    sound = SoundManager(FEATURES["SOUNDS"])
-    game = Game(sound)
-
-    running = True
+    marks.append(("display + fonts", time.perf_counter()))
+    sound = SoundManager(FEATURES["SOUNDS"], background=True)
+    seed, start = resume or (random.getrandbits(64), None)
+    game = Game(sound, seed=seed)
+    if start is not None: game.load_state(start)
+    game.prof.enabled = profile
+    marks.append(("game init", time.perf_counter()))
+    game.draw(screen, font, bigfont)
+    marks.append(("first draw", time.perf_counter()))
+    pygame.display.flip()
+    marks.append(("first flip", time.perf_counter()))
+    if timing:
+        prev = IMPORT_T0
+        for name, t in marks:
+            print(f"startup: {name:<16}{(t - prev) * 1000:7.1f} ms")
+            prev = t
+        print(f"startup: time to first frame {(prev - IMPORT_T0) * 1000:.1f} ms (from module import)")
+    gcc = GcControl(gc_mode)
+    gcc.start()
+    session = Session(game, seed, tick_rate, record, history_mb, start)
+    gov = QualityGovernor() if governor else None
+    cap = FrameCapture(capture, screen.get_size(), FPS) if capture else None
+
+    sim = None
+    if render_thread:
+        sim = SimThread(session, tick_rate, max_catchup)
+        run_threaded(game, screen, font, bigfont, pacer, gov, sim, cap, gcc)
+    step = 1.0 / tick_rate
+    acc = 0.0
+    running = not render_thread
     while running:
-        dt = clock.tick(FPS) / 1000.0
-        keys = pygame.key.get_pressed()
+        acc += pacer.wait()
+        pressed = pygame.key.get_pressed()
+        keys = InputState.from_pressed(pressed)
+        rewinding = pressed[pygame.K_BACKSPACE] and game.state != Game.MENU
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -715,23 +3058,113 @@ def main():
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
-                if game.state == Game.MENU:
-                    if event.key == pygame.K_1: game.difficulty = "Easy"
-                    elif event.key == pygame.K_2: game.difficulty = "Normal"
-                    elif event.key == pygame.K_3: game.difficulty = "Hard"
-                    elif event.key == pygame.K_RETURN: game.reset_run()
-                elif game.state == Game.PLAYING:
-                    if event.key == pygame.K_p: game.state = Game.PAUSED
-                elif game.state == Game.PAUSED:
-                    if event.key == pygame.K_p: game.state = Game.PLAYING
-                elif game.state == Game.GAMEOVER:
-                    if event.key == pygame.K_r: game.reset_run()
-
-        game.update(dt, keys)
-        game.draw(screen, font, bigfont)
-        pygame.display.flip()
-
+                if event.key == pygame.K_F3:
+                    game.prof.toggle()
+                if event.key == pygame.K_F5:
+                    session.quick_save()
+                if event.key == pygame.K_F9:
+                    session.quick_load()
+                ev = game.key_command(event.key)
+                if ev is not None: session.command(ev)
+
+        steps = 0
+        while acc >= step and steps < max_catchup:
+            session.step(step, keys, rewinding)
+            acc -= step
+            steps += 1
+        if steps == max_catchup and acc >= step:
+            acc = step * 0.999   # drop the backlog rather than spiral
+        game.draw(screen, font, bigfont, acc / step)
+        if cap is not None: cap.grab(screen)
+        pacer.present()
+        gcc.frame(game, pacer.last_work(), game.prof)
+        game.prof.end_frame()
+        if gov is not None:
+            ev = gov.observe(pacer.last_work(), game.quality)
+            if ev is not None: session.command(ev)
+
+    gcc.stop()
+    session.save_recording()
+    if cap is not None:
+        cap.close()
+        print(cap.report())
+    if game.scores: game.scores.close()
+    if timing:
+        print(sound.report())
+        print(pacer.report())
+        if sim is not None: print(sim.report())
+        if session.hist is not None: print(session.hist.report(tick_rate))
+        print(gcc.report())
     pygame.quit()
 
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Space Shooter")
+    ap.add_argument("--headless", action="store_true", help="run the simulation with no window at a fixed dt and report sim FPS")
+    ap.add_argument("--frames", type=int, default=3600, help="headless: frames to simulate")
+    ap.add_argument("--seed", type=int, default=0, help="headless: RNG seed")
+    ap.add_argument("--difficulty", choices=list(DIFFICULTIES), default="Normal")
+    ap.add_argument("--bot", action="store_true", help="headless: fly with the dodge-and-shoot bot instead of the sweep script")
+    ap.add_argument("--dt", type=float, default=1.0 / FPS, help="headless: fixed timestep in seconds")
+    ap.add_argument("--tick-rate", type=int, default=TICK_RATE, help="simulation steps per second")
+    ap.add_argument("--max-catchup", type=int, default=MAX_CATCHUP_STEPS, help="max simulation steps per rendered frame")
+    ap.add_argument("--timing", action="store_true", help="print startup timings, and input latency / frame pacing stats on exit")
+    ap.add_argument("--profile", action="store_true", help="start with the profiler overlay on (toggle with F3)")
+    ap.add_argument("--fixed-quality", action="store_true", help="disable the adaptive quality governor")
+    ap.add_argument("--pacing", choices=("classic", "low-latency"), default="classic",
+                    help="low-latency: sleep before sampling input so frames are presented just in time")
+    ap.add_argument("--spin-ms", type=float, default=0.0, help="low-latency: busy-wait this long before waking instead of sleeping")
+    ap.add_argument("--vsync", action="store_true", help="present with vsync (scaled window)")
+    ap.add_argument("--render-thread", action="store_true",
+                    help="simulate on a separate thread; the main thread draws the latest published snapshot")
+    ap.add_argument("--history-mb", type=float, help=f"memory for the rewind history (hold BACKSPACE; default {HISTORY_BUDGET_MB}, "
+                                                     "0 turns it off). headless: capture every step and report the cost")
+    ap.add_argument("--jump-in", type=float, metavar="SECONDS", help="with --replay FILE: fast-forward to SECONDS, then play on from there")
+    ap.add_argument("--capture", metavar="PATH", help="record video: out.y4m, out.rgb, frames/%%05d.png, a directory, or - "
+                                                      "(Y4M to stdout); with --replay --headless renders offscreen as fast as possible")
+    ap.add_argument("--waves", metavar="FILE", help=f"wave rules and timelines (default {os.path.basename(WAVES_FILE)} next to main.py; "
+                                                    "replays only verify against the file they were recorded with)")
+    ap.add_argument("--gc", choices=("managed", "python"), default="managed",
+                    help="managed: freeze startup objects, no automatic GC during play, collect at banners/pause/game over; "
+                         "python: stock collector. --timing reports the pauses either way")
+    ap.add_argument("--no-record", action="store_true", help=f"don't write the session replay to {REPLAY_DIR}/")
+    ap.add_argument("--replay", nargs="+", metavar="FILE", help="play back recorded sessions and verify score + state hash "
+                                                                "(with --headless: no window, max speed)")
+    return ap.parse_args(argv)
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.capture == "-": sys.stdout = sys.stderr  # stdout carries the video
+    if args.waves: load_waves(args.waves)
+    live = dict(record=not args.no_record, governor=not args.fixed_quality, pacing=args.pacing, spin_ms=args.spin_ms,
+                vsync=args.vsync, render_thread=args.render_thread,
+                history_mb=HISTORY_BUDGET_MB if args.history_mb is None else args.history_mb, capture=args.capture,
+                gc_mode=args.gc)
+    if args.replay and args.jump_in is not None:
+        try: rec = load_replay(args.replay[0])
+        except ValueError as e: raise SystemExit(str(e))
+        r = play_replay(args.replay[0], stop_at=int(args.jump_in * rec["tick_rate"]))
+        main(rec["tick_rate"], args.max_catchup, args.timing, args.profile, resume=(r["seed"], r["game"].save_state()), **live)
+    elif args.replay:
+        failed = 0
+        for path in args.replay:
+            try:
+                r = play_replay(path, render=not args.headless, capture=args.capture)
+            except ValueError as e:
+                print(e)
+                failed += 1
+                continue
+            failed += not r["ok"]
+            print(f"{path}: {'OK' if r['ok'] else 'MISMATCH'} {r['frames']} frames ({r['sim_seconds']:.1f}s sim, {r['bytes']} bytes) "
+                  f"in {r['wall_seconds']:.3f}s -> {r['fps']:.0f} sim FPS  score={r['score']} hash={r['hash'][:12]}")
+            if r["capture"]: print(r["capture"])
+        raise SystemExit(1 if failed else 0)
+    elif args.headless:
+        hist = StateHistory(args.history_mb) if args.history_mb else None
+        r = simulate(args.frames, args.seed, args.difficulty, args.dt, bot_input if args.bot else scripted_input, history=hist)
+        print(f"{r['frames']} frames ({r['sim_seconds']:.1f}s sim) in {r['wall_seconds']:.3f}s -> {r['fps']:.0f} sim FPS")
+        print(f"score={r['score']} wave={r['wave']} state={r['state']} hash={r['hash']}")
+        if hist is not None:
+            for _ in range(min(len(hist) - 1, round(5 / args.dt))): hist.rewind(r["game"])  # time 5 s of rewind
+            print(hist.report(round(1 / args.dt)))
+    else:
+        main(args.tick_rate, args.max_catchup, args.timing, args.profile, **live)